@@ -0,0 +1,61 @@
+""" Benchmark of the OEP/AEP period loss calculation
+Compares the dense scatter used by plt_calculator with the previous approach of
+merging the PLT against a placeholder of every period and grouping by PeriodId.
+
+Run with: python benchmarks/benchmark_ep_curve.py [number_of_simulations] [rows]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from plttools import plt_calculator
+
+
+def merge_period_losses(plt, number_of_simulations):
+    """ Previous implementation, kept here as the benchmark baseline """
+    plt_placeholder = []
+    for period in range(1, number_of_simulations + 1):
+        plt_placeholder.append(period)
+    placeholder = pd.DataFrame(plt_placeholder, columns=['PeriodId'])
+    complete_plt = pd.merge(placeholder, plt, how='left', on=['PeriodId'])
+    grouped = complete_plt[['PeriodId', 'Loss']].groupby('PeriodId')
+    return grouped.max().fillna(0), grouped.sum().fillna(0)
+
+
+def scatter_period_losses(plt, number_of_simulations):
+    """ Dense scatter used by calculate_oep_curve and calculate_aep_curve """
+    return (plt_calculator.dense_max_occurrence_losses(
+        plt['PeriodId'], plt['Loss'], number_of_simulations),
+            plt_calculator.dense_annual_losses(
+                plt['PeriodId'], plt['Loss'], number_of_simulations))
+
+
+def _time(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main(number_of_simulations=1000000, rows=3000000):
+    """ Times both approaches on a random PLT """
+    generator = np.random.default_rng(0)
+    plt = pd.DataFrame({
+        'PeriodId': generator.integers(1, number_of_simulations + 1, rows),
+        'EventId': generator.integers(1, 10 ** 7, rows),
+        'Loss': generator.pareto(1.5, rows) * 1000})
+
+    merge_max, merge_sum = merge_period_losses(plt, number_of_simulations)
+    scatter_max, scatter_sum = scatter_period_losses(plt, number_of_simulations)
+    assert np.allclose(merge_max.Loss.values, scatter_max)
+    assert np.allclose(merge_sum.Loss.values, scatter_sum)
+
+    merge_seconds = _time(merge_period_losses, plt, number_of_simulations)
+    scatter_seconds = _time(scatter_period_losses, plt, number_of_simulations)
+    print("{0} rows over {1} simulations".format(rows, number_of_simulations))
+    print("merge + groupby: {0:.3f}s".format(merge_seconds))
+    print("dense scatter:   {0:.3f}s ({1:.1f}x)".format(
+        scatter_seconds, merge_seconds / scatter_seconds))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:]])
@@ -2,3 +2,4 @@
 from plttools.ep_curve import EPCurve, EPType
 from plttools.plt import PLT
 from plttools.marginal_impact import MarginalImpact
+from plttools.portfolio import PortfolioAccumulator
@@ -1,4 +1,5 @@
 """ EP Curve module for the representation of an EP Curve"""
+from collections.abc import Mapping
 from enum import Enum
 import pandas as pd
 import numpy as np
@@ -12,21 +13,26 @@ class EPType(Enum):
 
 
 class EPCurve:
-    """EP Curve"""
+    """EP Curve
+    The curve is held as read-only arrays of probabilities, sorted ascending, and their
+    losses. Lookups interpolate linearly in probability and never modify the curve, so an
+    EPCurve can be shared between threads.
+    """
 
     RETURN_PERIODS = [1, 2, 5, 10, 20, 25, 50,
                       100, 150, 200, 250, 500, 1000, 10000]
     REQUIRED_COLUMNS = ["Probability", "Loss"]
 
-    def __init__(self, data: list, ep_type: EPType):
+    def __init__(self, data, ep_type: EPType):
         """ Type initialiser for EP Curve
 
         Parameters
         ----------
         data:
-            type(list)
+            type(list), type(dict) or type(pandas.DataFrame)
             Contains a list of Probability and Loss pairs [{"Probability":0.01, "Loss":1000}
-            ,{"Probability":0.02, "Loss":2000}]
+            ,{"Probability":0.02, "Loss":2000}] or the same data column-wise
+            {"Probability": [0.01, 0.02], "Loss": [1000, 2000]}
         ep_type:
             type(EPType)
             Enum representing the type of EP Curve that this is (AEP or OEP)
@@ -34,14 +40,23 @@ class EPCurve:
         Returns
         -------
         """
-        curve_data = pd.DataFrame(data)
-        if all(column in list(curve_data.columns.values) for column in EPCurve.REQUIRED_COLUMNS):
-            self.curve = curve_data
-
-            max_loss_probability = [{"Probability": np.finfo(
-                float).tiny, "Loss": self.curve.max().Loss}]
-            self.curve = self.curve.append(pd.DataFrame(max_loss_probability))
-            self.curve = self.curve.set_index('Probability')
+        curve_data = data if isinstance(
+            data, (pd.DataFrame, Mapping)) else pd.DataFrame(data)
+        if all(column in curve_data for column in EPCurve.REQUIRED_COLUMNS):
+            probabilities = np.asarray(
+                curve_data["Probability"], dtype=np.float64)
+            losses = np.asarray(curve_data["Loss"], dtype=np.float64)
+
+            max_loss = np.nanmax(losses) if len(losses) else np.nan
+            probabilities = np.append(probabilities, np.finfo(float).tiny)
+            losses = np.append(losses, max_loss)
+            order = np.argsort(probabilities, kind='stable')
+            self._probabilities = probabilities[order]
+            self._losses = losses[order]
+            # cumulative probability weighted losses from the tail for the TCE
+            self._tail_sums = np.cumsum(self._probabilities * self._losses)
+            for values in (self._probabilities, self._losses, self._tail_sums):
+                values.flags.writeable = False
 
             if ep_type is None:
                 self.ep_type = EPType.UNKNOWN
@@ -51,6 +66,27 @@ class EPCurve:
             raise ValueError(
                 "Probability and Loss fields not in data. Check the spelling")
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for values in (self._probabilities, self._losses, self._tail_sums):
+            values.flags.writeable = False
+
+    @property
+    def probabilities(self):
+        """ Curve probabilities sorted ascending, as a read-only array """
+        return self._probabilities
+
+    @property
+    def losses(self):
+        """ Curve losses aligned with the probabilities, as a read-only array """
+        return self._losses
+
+    @property
+    def curve(self):
+        """ The curve as a DataFrame of Loss indexed by Probability """
+        return pd.DataFrame({"Loss": self._losses},
+                            index=pd.Index(self._probabilities, name="Probability"))
+
     def loss_at_a_given_return_period(self, return_period: float):
         """ Get a loss from EP curve
 
@@ -69,14 +105,41 @@ class EPCurve:
                 "return_period: {0} supplied is not positive".format(return_period))
 
         probability = 1 / return_period
-        if probability in self.curve.index:
-            loss = self.curve.loc[probability].Loss
-        else:
-            probability_array = [probability]
-            self.curve = self.curve.reindex(self.curve.index.union(probability_array)).sort_index(
-                ascending=True).interpolate(method='index')
-            loss = self.curve.loc[probability].Loss
-        return loss
+        return np.interp(probability, self._probabilities, self._losses)
+
+    def losses_at_return_periods(self, return_periods):
+        """ Get the losses at many return periods in one vectorized lookup
+
+        Parameters
+        ----------
+        return_periods:
+            type(array-like)
+            Positive numbers representing the return periods (reciprocals of the probabilities)
+
+        Returns
+        -------
+        type(numpy.ndarray) Return Period Losses in the order of return_periods
+        """
+        return_periods = np.asarray(return_periods, dtype=np.float64)
+        _check_positive(return_periods, "return_periods")
+        return self.losses_at_probabilities(1 / return_periods)
+
+    def losses_at_probabilities(self, probabilities):
+        """ Get the losses at many exceedance probabilities in one vectorized lookup
+
+        Parameters
+        ----------
+        probabilities:
+            type(array-like)
+            Positive exceedance probabilities
+
+        Returns
+        -------
+        type(numpy.ndarray) Losses in the order of probabilities
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        _check_positive(probabilities, "probabilities")
+        return np.interp(probabilities, self._probabilities, self._losses)
 
     def tce_loss_at_a_given_return_period(self, return_period):
         """ Calculate TCE from EP curve at a given return period
@@ -99,11 +162,41 @@ class EPCurve:
             raise ValueError(
                 "return_period: {0} supplied is not positive".format(return_period))
 
-        return_period_loss = self.loss_at_a_given_return_period(return_period)
-        probability = 1 / return_period
-        subset = self.curve[self.curve.index <= probability]
-        expected_loss_above_rpl = (subset.index * subset['Loss']).mean()
-        return return_period_loss + expected_loss_above_rpl
+        return self.tce_losses_at_return_periods([return_period])[0]
+
+    def tce_losses_at_return_periods(self, return_periods):
+        """ Calculate TCE from EP curve at many return periods in one vectorized pass
+        Same methodology as tce_loss_at_a_given_return_period, where the tail average is
+        taken from cumulative sums over the curve so each return period is O(log n).
+
+        Parameters
+        ----------
+        return_periods:
+            type(array-like)
+            Positive numbers representing the return periods (reciprocals of the probabilities)
+
+        Returns
+        -------
+        type(numpy.ndarray) Tail conditional expected losses in the order of return_periods
+        """
+        return_periods = np.asarray(return_periods, dtype=np.float64)
+        _check_positive(return_periods, "return_periods")
+        probabilities = 1 / return_periods
+        return_period_losses = np.interp(
+            probabilities, self._probabilities, self._losses)
+
+        tail_points = np.searchsorted(
+            self._probabilities, probabilities, side='right')
+        last_point = np.maximum(tail_points - 1, 0)
+        tail_sums = np.where(
+            tail_points > 0, self._tail_sums[last_point], 0.0)
+        # the return period point itself is part of the tail when it is not on the curve
+        on_curve = (tail_points > 0) & (
+            self._probabilities[last_point] == probabilities)
+        tail_sums = tail_sums + np.where(
+            on_curve, 0.0, probabilities * return_period_losses)
+        tail_points = tail_points + ~on_curve
+        return return_period_losses + tail_sums / tail_points
 
     def get_ep_type(self):
         """ Get the type of EP Curve
@@ -118,18 +211,22 @@ class EPCurve:
         return self.ep_type
 
     def get_standard_return_period_ep(self):
-        """ Calculates standard EP return periods and returns the overall curve
+        """ Calculates the losses at the standard EP return periods
 
         Parameters
         ----------
 
         Returns
         -------
-        type(dict) The following structure [{"Probability":0.01, "Loss":1000},
-        {"Probability":0.02, "Loss":2000}]
+        type(dict) The following structure {0.01: 1000, 0.02: 2000} of Probability to Loss
         """
-        return_periods = EPCurve.RETURN_PERIODS
-        probabilities = list(map(lambda x: 1/x, return_periods))
-        self.curve = self.curve.reindex(self.curve.index.union(probabilities)).sort_index(
-            ascending=True).interpolate(method='index')
-        return self.curve.to_dict()['Loss']
+        probabilities = 1 / np.asarray(EPCurve.RETURN_PERIODS, dtype=np.float64)
+        losses = self.losses_at_probabilities(probabilities)
+        return dict(zip(probabilities.tolist(), losses.tolist()))
+
+
+def _check_positive(values, name):
+    not_positive = values[~(values > 0)]
+    if len(not_positive):
+        raise ValueError("{0}: {1} supplied are not positive".format(
+            name, ', '.join(str(value) for value in not_positive)))
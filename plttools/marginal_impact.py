@@ -1,35 +1,52 @@
-from plttools import PLT, plt_calculator, EPCurve
+import numpy as np
+import pandas as pd
+from plttools import plt_calculator, EPCurve
+from plttools.ep_curve import EPType
+from plttools.plt_calculator import _as_plt
 
 
 class MarginalImpact:
-    """ Marginal Impact """
+    """ Marginal Impact
+    Annual losses are additive per period, so the grouped AAL and AEP come from adding the
+    submission's dense annual losses to the cached base annual losses rather than from
+    grouping the PLTs.
+    """
 
     def __init__(self, base_plt, submission_plt, number_of_simulations):
         self.base_plt = base_plt
         self.submission_plt = submission_plt
-        self.grouped_plt = plt_calculator.group_plts(base_plt, submission_plt)
         self.number_of_simulations = number_of_simulations
+        self._grouped_plt = None
+        self._aep_curves = {}
+
+    @property
+    def grouped_plt(self):
+        """ The base and submission PLTs grouped together, only built when it is used """
+        if self._grouped_plt is None:
+            self._grouped_plt = plt_calculator.group_plts(
+                self.base_plt, self.submission_plt)
+        return self._grouped_plt
 
     def base_aal(self):
-        return self.base_plt.get_aal()
+        return self._base_annual_losses().sum() / self.number_of_simulations
 
     def submission_aal(self):
-        return self.submission_plt().get_aal()
+        return self._submission_annual_losses().sum() / self.number_of_simulations
 
     def grouped_aal(self):
-        return self.grouped_plt.get_aal()
+        return self._grouped_annual_losses().sum() / self.number_of_simulations
 
     def change_in_aal(self):
         return abs(self.base_aal() - self.grouped_aal())/self.base_aal()
 
     def base_aep(self):
-        return plt_calculator.calculate_aep_curve(self.base_plt.plt, self.number_of_simulations)
+        return self._aep_curve("base", self._base_annual_losses)
 
     def submission_aep(self):
-        return plt_calculator.calculate_aep_curve(self.submission_plt.plt, self.number_of_simulations)
+        return self._aep_curve("submission", self._submission_annual_losses)
 
     def grouped_aep(self):
-        return plt_calculator.calculate_aep_curve(self.grouped_plt.plt, self.number_of_simulations)
+        return self._aep_curve("grouped", self._grouped_annual_losses)
 
     def marginal_aep(self):
         grouped_aep_std = self.grouped_aep().get_standard_return_period_ep()
@@ -43,3 +60,113 @@ class MarginalImpact:
                 base_aep_std[probability] - grouped_aep_std[probability])/base_aep_std[probability]
 
         return marginal_aep
+
+    @staticmethod
+    def screen(base_plt, submissions, number_of_simulations, return_periods=None):
+        """ Screens many submissions against one base, aggregating the base only once.
+        The grouped annual losses of every submission are evaluated together as a
+        (submission x period) array. The grouped occurrence losses add each submission
+        occurrence to the same base occurrence, assuming losses are not negative.
+
+        Parameters
+        ----------
+        base_plt:
+            type(PLT)
+        submissions:
+            type(list) or type(dict)
+            Submission PLTs, or a dict of submission name to PLT
+        number_of_simulations:
+            type(int)
+            Number of simulation periods
+        return_periods:
+            type(list)
+            Return periods of the marginal AEP and OEP. Defaults to EPCurve.RETURN_PERIODS
+
+        Returns
+        -------
+        pandas.DataFrame :
+            One row per submission, ranked by ChangeInAAL descending, with the SubmissionAAL,
+            ChangeInAAL and a MarginalAEP_<rp> and MarginalOEP_<rp> column per return period
+        """
+        if return_periods is None:
+            return_periods = EPCurve.RETURN_PERIODS
+        if isinstance(submissions, dict):
+            names, submissions = list(submissions), list(submissions.values())
+        else:
+            submissions = list(submissions)
+            names = list(range(len(submissions)))
+        base_plt = _as_plt(base_plt, number_of_simulations)
+        base_annual_losses = _annual_losses(base_plt, number_of_simulations)
+        base_max_losses = base_plt.dense_period_losses(np.maximum, number_of_simulations)
+
+        # base occurrences sorted by their packed key, to be matched by binary search
+        base_occurrences = plt_calculator.group_plts(base_plt)
+        base_keys = base_occurrences.occurrence_keys()
+        key_order = np.argsort(base_keys)
+        base_keys = base_keys[key_order]
+        base_occurrence_losses = base_occurrences.losses[key_order]
+        base_grouped_max_losses = base_occurrences.dense_period_losses(
+            np.maximum, number_of_simulations)
+
+        grouped_annual_losses = np.empty((len(submissions), number_of_simulations))
+        grouped_max_losses = np.empty((len(submissions), number_of_simulations))
+        submission_aals = np.empty(len(submissions))
+        for row, submission in enumerate(submissions):
+            submission = _as_plt(submission, number_of_simulations)
+            submission_annual_losses = _annual_losses(submission, number_of_simulations)
+            submission_aals[row] = submission_annual_losses.sum() / number_of_simulations
+            grouped_annual_losses[row] = submission_annual_losses
+
+            occurrences = plt_calculator.group_plts(submission)
+            occurrence_losses = occurrences.losses + _matched_losses(
+                base_keys, base_occurrence_losses, occurrences.occurrence_keys())
+            grouped_max_losses[row] = plt_calculator.dense_max_occurrence_losses(
+                occurrences.period_ids, occurrence_losses, number_of_simulations)
+        grouped_annual_losses += base_annual_losses
+        np.maximum(grouped_max_losses, base_grouped_max_losses, out=grouped_max_losses)
+
+        base_aal = base_annual_losses.sum() / number_of_simulations
+        grouped_aals = grouped_annual_losses.sum(axis=1) / number_of_simulations
+        base_aep = plt_calculator.return_period_losses(base_annual_losses, return_periods)
+        base_oep = plt_calculator.return_period_losses(base_max_losses, return_periods)
+        grouped_aep = plt_calculator.return_period_losses(grouped_annual_losses, return_periods)
+        grouped_oep = plt_calculator.return_period_losses(grouped_max_losses, return_periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            screened = {"SubmissionAAL": submission_aals,
+                        "ChangeInAAL": np.abs(base_aal - grouped_aals) / base_aal}
+            marginal_aep = np.abs(base_aep - grouped_aep) / base_aep
+            marginal_oep = np.abs(base_oep - grouped_oep) / base_oep
+        for column, return_period in enumerate(return_periods):
+            screened["MarginalAEP_{0}".format(return_period)] = marginal_aep[:, column]
+        for column, return_period in enumerate(return_periods):
+            screened["MarginalOEP_{0}".format(return_period)] = marginal_oep[:, column]
+        screened = pd.DataFrame(screened, index=pd.Index(names, name="Submission"))
+        return screened.sort_values(by="ChangeInAAL", ascending=False, kind="stable")
+
+    def _base_annual_losses(self):
+        return _annual_losses(self.base_plt, self.number_of_simulations)
+
+    def _submission_annual_losses(self):
+        return _annual_losses(self.submission_plt, self.number_of_simulations)
+
+    def _grouped_annual_losses(self):
+        return self._base_annual_losses() + self._submission_annual_losses()
+
+    def _aep_curve(self, name, annual_losses):
+        if name not in self._aep_curves:
+            self._aep_curves[name] = plt_calculator.calculate_ep_curve(
+                annual_losses(), EPType.AEP)
+        return self._aep_curves[name]
+
+
+def _annual_losses(plt, number_of_simulations):
+    return _as_plt(plt, number_of_simulations).dense_period_losses(
+        np.add, number_of_simulations)
+
+
+def _matched_losses(sorted_keys, sorted_losses, keys):
+    """ Losses of the sorted occurrences with the same keys, zero where there is none """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys))
+    matches = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return np.where(sorted_keys[matches] == keys, sorted_losses[matches], 0.0)
@@ -1,6 +1,13 @@
 """ PLT """
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 
+MISSING_DATE = np.iinfo(np.int32).min
+OCCURRENCE_KEY = np.dtype([("PeriodId", "<i4"), ("EventId", "<i8"),
+                           ("EventDate", "<i4"), ("LossDate", "<i4")])
+
 
 class PLT:
     """ Period Loss Table (PLT)
@@ -14,19 +21,37 @@ class PLT:
         BusinessUnit (string - optional)
         Admin1 (string - optional)
         Country (string - optional)
+
+        The PLT is held column-wise in contiguous read-only NumPy arrays:
+        PeriodId as int32, EventId as int64, Loss as float64 and the dates as int32
+        days since the epoch. The `plt` attribute is a DataFrame view over those arrays.
+        Rows are sorted by PeriodId once on construction and indexed by period offsets,
+        so the rows of period p are [offsets[p], offsets[p + 1]). Dense annual and max
+        occurrence loss vectors are computed on first use and cached until the data or
+        the number of simulations changes.
+        The optional segment columns are dictionary encoded as int32 codes into sorted
+        categories, and filter selects segments through a per-segment row index.
     """
 
     REQUIRED_COLUMNS = ["PeriodId", "EventId", "LossDate", "EventDate", "Loss"]
+    DATE_COLUMNS = ["EventDate", "LossDate"]
+    SEGMENT_COLUMNS = ["Peril", "BusinessUnit", "Admin1", "Country"]
+    COLUMN_DTYPES = {"PeriodId": np.int32,
+                     "EventId": np.int64,
+                     "EventDate": np.int32,
+                     "LossDate": np.int32,
+                     "Loss": np.float64}
 
-    def __init__(self, data: list, number_of_simulations: int = None):
+    def __init__(self, data, number_of_simulations: int = None):
         """ Type initialiser for PLT
 
         Parameters
         ----------
         data:
-            type(list)
+            type(list), type(dict) or type(pandas.DataFrame)
             Contains a list of Period Losses [{"PeriodId": 1, "EventId":1,
             "EventDate":8/25/2016 12:00:00 AM, "LossDate":"3/13/2016 12:00:00 AM", "Loss":1000}]
+            or the same data column-wise {"PeriodId": [1], "EventId": [1], ...}
         number_of_simulations:
             type(int)
             Number of simulation periods. Will default to the max period of the PLT if None
@@ -34,17 +59,484 @@ class PLT:
         Returns
         -------
         """
-        plt_data = pd.DataFrame(data)
-        if all(column in list(plt_data.columns.values) for column in PLT.REQUIRED_COLUMNS):
-            self.plt = plt_data
-            if number_of_simulations is None:
-                self.simulations = self.plt[['PeriodId']].max().PeriodId
+        columns = _as_columns(data)
+        if all(column in columns for column in PLT.REQUIRED_COLUMNS):
+            self._load(columns, number_of_simulations)
+        else:
+            raise ValueError(
+                "{0} fields not in data. Check the spelling".format(
+                    ', '.join(PLT.REQUIRED_COLUMNS)))
+
+    @classmethod
+    def from_arrays(cls, period_ids, event_ids, losses, event_dates, loss_dates,
+                    number_of_simulations: int = None, **optional_columns):
+        """ Creates a PLT directly from column arrays, skipping any row-wise conversion
+
+        Parameters
+        ----------
+        period_ids, event_ids, losses:
+            type(array-like)
+            PeriodId, EventId and Loss columns
+        event_dates, loss_dates:
+            type(array-like)
+            EventDate and LossDate columns, either datetimes, date strings or int days
+        number_of_simulations:
+            type(int)
+            Number of simulation periods. Will default to the max period of the PLT if None
+        optional_columns:
+            Any optional columns e.g. Peril, Country
+
+        Returns
+        -------
+        PLT
+        """
+        columns = {"PeriodId": period_ids,
+                   "EventId": event_ids,
+                   "EventDate": event_dates,
+                   "LossDate": loss_dates,
+                   "Loss": losses}
+        columns.update(optional_columns)
+        return cls(columns, number_of_simulations)
+
+    def _load(self, columns, number_of_simulations):
+        data = {}
+        categories = {}
+        for name, values in columns.items():
+            if name in PLT.DATE_COLUMNS:
+                data[name] = _to_days(values)
+            elif name in PLT.SEGMENT_COLUMNS:
+                data[name], categories[name] = _encode_segment(values)
+            elif name in PLT.COLUMN_DTYPES:
+                data[name] = np.ascontiguousarray(
+                    values, dtype=PLT.COLUMN_DTYPES[name])
             else:
-                self.simulations = number_of_simulations
+                data[name] = np.asarray(values)
+        lengths = {len(values) for values in data.values()}
+        if len(lengths) > 1:
+            raise ValueError("PLT columns must all have the same length")
+        period_ids = data["PeriodId"]
+        if len(period_ids) and period_ids.min() < 0:
+            raise ValueError("PeriodId must not be negative")
+        if np.any(period_ids[1:] < period_ids[:-1]):
+            order = np.argsort(period_ids, kind='stable')
+            data = {name: values[order] for name, values in data.items()}
+        self._set_data(data, number_of_simulations, categories=categories)
+
+    @classmethod
+    def _from_columns(cls, data, number_of_simulations=None, offsets=None, categories=None):
+        """ Creates a PLT around typed, period sorted column arrays without copying them.
+            The period offsets are derived from PeriodId unless they are supplied, and
+            segment columns are codes into their categories.
+        """
+        plt = cls.__new__(cls)
+        plt._set_data(data, number_of_simulations, offsets, categories)
+        return plt
+
+    def _set_data(self, data, number_of_simulations, offsets=None, categories=None):
+        for values in data.values():
+            values.flags.writeable = False
+        self._data = data
+        self._categories = dict(categories or {})
+        for values in self._categories.values():
+            values.flags.writeable = False
+        self._date_views = {}
+        self._frame = None
+        self._segment_index = {}
+        self._build_period_index(offsets)
+        if number_of_simulations is None:
+            self.simulations = int(self._periods[-1]) if len(self._periods) else 0
         else:
+            self.simulations = number_of_simulations
+
+    @property
+    def simulations(self):
+        """ Number of simulation periods """
+        return self._simulations
+
+    @simulations.setter
+    def simulations(self, number_of_simulations):
+        self._simulations = number_of_simulations
+        self._period_losses = {}
+
+    @property
+    def plt(self):
+        """ DataFrame of the PLT, built on first access and kept until the data changes.
+            Depending on the pandas version the numeric columns are the PLT arrays or a copy
+            of them, so the frame must not be modified. Columns cannot be assigned on it;
+            assign a new DataFrame to `plt` to replace the data, e.g.
+            `frame = my_plt.plt.copy(); frame['Loss'] *= 2; my_plt.plt = frame`.
+        """
+        if self._frame is None:
+            frame = {}
+            for name, values in self._data.items():
+                if name in PLT.DATE_COLUMNS:
+                    frame[name] = self._date_view(name)
+                elif name in self._categories:
+                    frame[name] = pd.Categorical.from_codes(
+                        values, self._categories[name].copy())
+                else:
+                    frame[name] = values
+            self._frame = _FrameView(frame, copy=False)
+        return self._frame
+
+    @plt.setter
+    def plt(self, data):
+        columns = _as_columns(data)
+        if not all(column in columns for column in PLT.REQUIRED_COLUMNS):
             raise ValueError(
                 "{0} fields not in data. Check the spelling".format(
                     ', '.join(PLT.REQUIRED_COLUMNS)))
+        self._load(columns, self.simulations)
+
+    @property
+    def period_ids(self):
+        """ PeriodId column as a read-only int32 array """
+        return self._data["PeriodId"]
+
+    @property
+    def event_ids(self):
+        """ EventId column as a read-only int64 array """
+        return self._data["EventId"]
+
+    @property
+    def losses(self):
+        """ Loss column as a read-only float64 array """
+        return self._data["Loss"]
+
+    @property
+    def event_dates(self):
+        """ EventDate column as a read-only int32 array of days since the epoch """
+        return self._data["EventDate"]
+
+    @property
+    def loss_dates(self):
+        """ LossDate column as a read-only int32 array of days since the epoch """
+        return self._data["LossDate"]
+
+    def __len__(self):
+        return len(self._data["PeriodId"])
+
+    def columns(self):
+        """ Retrieves the PLT columns as read-only arrays, with the dates as int32 days
+            and the segment columns as int32 codes into categories(name), -1 where missing
+            Parameters
+            ----------
+
+            Returns
+            -------
+            dict :
+                Column name to array
+        """
+        return dict(self._data)
+
+    def column(self, name):
+        """ Retrieves one PLT column as a read-only array, in the form of columns(). On a
+            view only this column is gathered, where columns() gathers every column
+            Parameters
+            ----------
+            name:
+                type(str)
+                Column name
+
+            Returns
+            -------
+            numpy.ndarray :
+                The column
+        """
+        return self._data[name]
+
+    def categories(self, name):
+        """ Retrieves the categories of a segment column
+            Parameters
+            ----------
+            name:
+                type(str)
+                One of the SEGMENT_COLUMNS in the PLT
+
+            Returns
+            -------
+            numpy.ndarray :
+                The sorted distinct values of the column, indexed by its codes
+        """
+        if name not in self._categories:
+            raise ValueError("{0} is not a segment column of the PLT".format(name))
+        return self._categories[name]
+
+    def filter(self, **criteria):
+        """ Selects the rows of one or more segments, e.g. filter(Peril="WS", Country="US").
+            The first segment's rows come from a row index built once per column and the
+            other criteria are checked on those rows only. The PLT returned is a view that
+            holds the selected row numbers and copies the selected rows of a column from this
+            PLT the first time the column is used.
+
+            Parameters
+            ----------
+            criteria:
+                Segment column to a value or a list of values to keep
+
+            Returns
+            -------
+            PLTView :
+                The selected rows, in period order, with the same number of simulations
+        """
+        rows = None
+        for name, values in criteria.items():
+            codes = pd.Index(self.categories(name)).get_indexer(
+                np.atleast_1d(np.asarray(values, dtype=object)))
+            codes = np.unique(codes[codes >= 0])
+            if rows is None:
+                rows = self._segment_rows(name, codes)
+            else:
+                rows = rows[np.isin(self._data[name][rows], codes)]
+        if rows is None:
+            rows = np.arange(len(self))
+        return self._view(rows)
+
+    def save_mmap(self, path):
+        """ Writes the PLT to a directory of fixed width column files with its period index,
+            to be opened with open_mmap.
+
+            Parameters
+            ----------
+            path:
+                type(str)
+                Directory, created if it does not exist
+
+            Returns
+            -------
+        """
+        from plttools import storage  # pylint: disable=import-outside-toplevel
+        storage.write_mmap(self, path)
+
+    @classmethod
+    def open_mmap(cls, path, columns=None, periods=None):
+        """ Opens a PLT saved with save_mmap with its columns memory-mapped. Only the pages of
+            the columns and periods that are used are read, and processes opening the same
+            PLT share one copy in the page cache.
+
+            Parameters
+            ----------
+            path:
+                type(str)
+                Directory written by save_mmap
+            columns:
+                type(list)
+                Optional columns to open as well as the REQUIRED_COLUMNS. All if None
+            periods:
+                type(tuple)
+                Optional inclusive (first, last) PeriodId range to open
+
+            Returns
+            -------
+            PLT
+        """
+        from plttools import storage  # pylint: disable=import-outside-toplevel
+        return storage.open_mmap(path, columns, periods)
+
+    def to_shared_memory(self, columns=None):
+        """ Copies the PLT into a shared memory block owned by this process. The returned
+            handle is picklable and is sent to other processes, which attach to the block
+            with from_shared_memory. Close and unlink the handle (or use it as a context
+            manager) once the workers are done.
+
+            Parameters
+            ----------
+            columns:
+                type(list)
+                Optional columns to share, e.g. ["PeriodId", "Loss"]. All numeric if None
+
+            Returns
+            -------
+            SharedPLT
+        """
+        from plttools.shared import SharedPLT  # pylint: disable=import-outside-toplevel
+        return SharedPLT(self, columns)
+
+    @classmethod
+    def from_shared_memory(cls, shared_plt):
+        """ Attaches to a PLT in shared memory without copying it
+
+            Parameters
+            ----------
+            shared_plt:
+                type(SharedPLT)
+                Handle returned by to_shared_memory
+
+            Returns
+            -------
+            PLT
+        """
+        return shared_plt.attach()
+
+    def occurrence_keys(self):
+        """ Retrieves the occurrence key (PeriodId, EventId, EventDate, LossDate) of each row,
+            packed into a fixed width value that can be hashed, sorted and searched as one
+            Parameters
+            ----------
+
+            Returns
+            -------
+            numpy.ndarray :
+                Packed occurrence keys aligned with the PLT rows
+        """
+        keys = np.empty(len(self), dtype=OCCURRENCE_KEY)
+        for name in OCCURRENCE_KEY.names:
+            keys[name] = self._data[name]
+        return keys.view("V{0}".format(OCCURRENCE_KEY.itemsize))
+
+    @classmethod
+    def from_parquet(cls, path, columns=None, periods=None, number_of_simulations: int = None):
+        """ Reads a PLT from a parquet file or directory straight into column arrays.
+            Requires pyarrow.
+
+            Parameters
+            ----------
+            path:
+                type(str)
+                Parquet file or directory
+            columns:
+                type(list)
+                Optional columns to read as well as the REQUIRED_COLUMNS. All if None
+            periods:
+                type(tuple)
+                Optional inclusive (first, last) PeriodId range, pushed down to the reader
+            number_of_simulations:
+                type(int)
+                Number of simulation periods. Will default to the max period of the PLT if None
+
+            Returns
+            -------
+            PLT
+        """
+        from plttools import storage  # pylint: disable=import-outside-toplevel
+        return storage.read_arrow(path, "parquet", columns, periods, number_of_simulations)
+
+    def to_parquet(self, path, **kwargs):
+        """ Writes the PLT to a parquet file. Requires pyarrow.
+
+            Parameters
+            ----------
+            path:
+                type(str)
+                Parquet file
+            kwargs:
+                Passed through to pyarrow.parquet.write_table e.g. row_group_size
+
+            Returns
+            -------
+        """
+        from plttools import storage  # pylint: disable=import-outside-toplevel
+        storage.write_arrow(self, path, "parquet", **kwargs)
+
+    @classmethod
+    def from_feather(cls, path, columns=None, periods=None, number_of_simulations: int = None):
+        """ Reads a PLT from a feather (Arrow IPC) file straight into column arrays.
+            Requires pyarrow. See from_parquet for the parameters.
+
+            Returns
+            -------
+            PLT
+        """
+        from plttools import storage  # pylint: disable=import-outside-toplevel
+        return storage.read_arrow(path, "feather", columns, periods, number_of_simulations)
+
+    def to_feather(self, path, **kwargs):
+        """ Writes the PLT to a feather (Arrow IPC) file. Requires pyarrow.
+            kwargs are passed through to pyarrow.feather.write_feather e.g. compression
+
+            Returns
+            -------
+        """
+        from plttools import storage  # pylint: disable=import-outside-toplevel
+        storage.write_arrow(self, path, "feather", **kwargs)
+
+    @property
+    def period_offsets(self):
+        """ Compressed sparse row offsets over the period sorted rows. The rows of period p
+            are [period_offsets[p], period_offsets[p + 1])
+        """
+        return self._offsets
+
+    def period_slice(self, period_id: int):
+        """ Retrieves the rows of a single period
+            Parameters
+            ----------
+            period_id:
+                type(int)
+                The period to retrieve
+
+            Returns
+            -------
+            slice :
+                Slice selecting the period's rows from any of the PLT column arrays
+        """
+        if 0 <= period_id < len(self._offsets) - 1:
+            return slice(self._offsets[period_id], self._offsets[period_id + 1])
+        return slice(len(self), len(self))
+
+    def period_sums(self):
+        """ Retrieves the total loss of each period with losses
+            Parameters
+            ----------
+
+            Returns
+            -------
+            (numpy.ndarray, numpy.ndarray) :
+                The PeriodIds with losses and their summed losses
+        """
+        return self._periods, self._reduce_periods(np.add)
+
+    def period_maxima(self):
+        """ Retrieves the largest single loss of each period with losses
+            Parameters
+            ----------
+
+            Returns
+            -------
+            (numpy.ndarray, numpy.ndarray) :
+                The PeriodIds with losses and their maximum losses
+        """
+        return self._periods, self._reduce_periods(np.maximum)
+
+    @property
+    def annual_losses(self):
+        """ Dense vector of the total loss in each of the simulation periods 1..simulations,
+            zero for periods without losses. Computed once and cached.
+        """
+        return self._cached_period_losses(np.add)
+
+    @property
+    def max_occurrence_losses(self):
+        """ Dense vector of the largest single loss in each of the simulation periods
+            1..simulations, zero for periods without losses. Computed once and cached.
+        """
+        return self._cached_period_losses(np.maximum)
+
+    def dense_period_losses(self, ufunc, number_of_simulations: int = None, workers: int = None):
+        """ Reduces the losses of each period into a dense vector over 1..number_of_simulations
+            Parameters
+            ----------
+            ufunc:
+                type(numpy.ufunc)
+                np.add for annual losses or np.maximum for max occurrence losses
+            number_of_simulations:
+                type(int)
+                Number of simulation periods. Defaults to the PLT simulations, which are cached
+            workers:
+                type(int)
+                Number of threads reducing contiguous period ranges. Every period is reduced
+                over the same rows in the same order, so the result is identical to the
+                serial reduction. Serial if None
+
+            Returns
+            -------
+            numpy.ndarray :
+                Period losses where index i holds period i + 1. Periods outside
+                1..number_of_simulations are excluded
+        """
+        if number_of_simulations is None or number_of_simulations == self.simulations:
+            return self._cached_period_losses(ufunc, workers)
+        return self._dense_period_losses(ufunc, number_of_simulations, workers)
 
     def get_aal(self):
         """ Retrieves the AAL for the PLT
@@ -54,12 +546,11 @@ class PLT:
             Returns
             -------
             float :
-                The average annual loss = total annual losses / number of simulations
+                The average annual loss = total annual losses / number of simulations,
+                including the losses of periods above the number of simulations
         """
-        annual_losses = self.plt[['PeriodId', 'Loss']
-                                 ].groupby('PeriodId').sum()
-        total_annual_losses = annual_losses[['Loss']].sum()
-        aal = total_annual_losses.Loss / self.simulations
+        total_annual_losses = self.losses.sum()
+        aal = total_annual_losses / self.simulations
         return aal
 
     def get_standard_deviation(self):
@@ -70,9 +561,247 @@ class PLT:
             Returns
             -------
             float :
-                The standard deviation of the annual losses for the PLT
+                The standard deviation of the annual losses for the PLT, including
+                the periods without losses
         """
-        annual_losses = self.plt[['PeriodId', 'Loss']
-                                 ].groupby('PeriodId').sum()
-        stddev = annual_losses.Loss.std()
+        stddev = pd.Series(self.annual_losses).std()
         return stddev
+
+    def _build_period_index(self, offsets=None):
+        if offsets is not None:
+            # a stored index, which avoids reading the PeriodId column
+            self._offsets = offsets
+            self._periods = np.flatnonzero(np.diff(offsets)).astype(np.int32)
+            self._period_starts = np.asarray(offsets[self._periods], dtype=np.int64)
+            return
+        period_ids = self._data["PeriodId"]
+        if len(period_ids):
+            counts = np.bincount(period_ids)
+            self._period_starts = np.flatnonzero(
+                np.diff(period_ids, prepend=-1))
+        else:
+            counts = np.zeros(1, dtype=np.int64)
+            self._period_starts = np.zeros(0, dtype=np.int64)
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._periods = period_ids[self._period_starts]
+        self._offsets.flags.writeable = False
+
+    def _reduce_periods(self, ufunc, workers=None):
+        if len(self._period_starts) == 0:
+            return np.zeros(0, dtype=np.float64)
+        if workers is None or workers <= 1:
+            return ufunc.reduceat(self.losses, self._period_starts)
+        # contiguous period ranges of about the same number of rows
+        row_bounds = np.linspace(0, len(self), workers + 1)[1:-1]
+        bounds = np.unique(np.concatenate((
+            [0], np.searchsorted(self._period_starts, row_bounds),
+            [len(self._period_starts)])))
+        row_starts = np.append(self._period_starts, len(self))
+        reduced = np.empty(len(self._period_starts), dtype=np.float64)
+
+        def reduce_range(first, last):
+            losses = self.losses[row_starts[first]:row_starts[last]]
+            reduced[first:last] = ufunc.reduceat(
+                losses, self._period_starts[first:last] - row_starts[first])
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(reduce_range, bounds[:-1], bounds[1:]))
+        return reduced
+
+    def _cached_period_losses(self, ufunc, workers=None):
+        if ufunc not in self._period_losses:
+            period_losses = self._dense_period_losses(ufunc, self.simulations, workers)
+            period_losses.flags.writeable = False
+            self._period_losses[ufunc] = period_losses
+        return self._period_losses[ufunc]
+
+    def _dense_period_losses(self, ufunc, number_of_simulations, workers=None):
+        period_losses = np.zeros(number_of_simulations, dtype=np.float64)
+        in_range = (self._periods >= 1) & (self._periods <= number_of_simulations)
+        period_losses[self._periods[in_range] - 1] = self._reduce_periods(
+            ufunc, workers)[in_range]
+        return period_losses
+
+    def summary(self):
+        """ Retrieves the summary metrics for the PLT from a single aggregation
+            Parameters
+            ----------
+
+            Returns
+            -------
+            PLTSummary :
+                AAL, standard deviation, CV and the standard return period OEP, AEP and TCEs
+        """
+        from plttools import plt_calculator  # pylint: disable=import-outside-toplevel
+        return plt_calculator.summarize(self)
+
+    def _segment_rows(self, name, codes):
+        if name not in self._segment_index:
+            # rows grouped by code in row order, missing values (-1) first
+            segment_codes = self._data[name]
+            order = np.argsort(segment_codes, kind='stable')
+            counts = np.bincount(segment_codes + 1,
+                                 minlength=len(self._categories[name]) + 1)
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            order.flags.writeable = False
+            self._segment_index[name] = (order, offsets)
+        order, offsets = self._segment_index[name]
+        rows = [order[offsets[code + 1]:offsets[code + 2]] for code in codes]
+        if len(rows) == 1:
+            return rows[0]
+        return np.sort(np.concatenate(rows + [np.zeros(0, dtype=order.dtype)]))
+
+    def _view(self, rows):
+        return PLTView(self, rows)
+
+    def _date_view(self, name):
+        if name not in self._date_views:
+            days = self._data[name]
+            dates = days.astype('datetime64[D]')
+            # NaT before the cast, as MISSING_DATE overflows in nanoseconds
+            dates[days == MISSING_DATE] = np.datetime64('NaT', 'D')
+            dates = dates.astype('datetime64[ns]')
+            dates.flags.writeable = False
+            self._date_views[name] = dates
+        return self._date_views[name]
+
+
+class PLTView(PLT):
+    """ PLT View
+        A PLT over selected rows of a parent PLT. It holds the row numbers and derives its
+        period index from the parent's without reading PeriodId. A column is gathered from
+        the parent the first time it is used, which copies the selected rows of that
+        column and keeps the copy; columns() gathers every column, column(name) only one.
+    """
+
+    def __init__(self, parent, rows):
+        """ Type initialiser for PLT View
+
+        Parameters
+        ----------
+        parent:
+            type(PLT)
+        rows:
+            type(numpy.ndarray)
+            Sorted row numbers of the parent to select
+
+        Returns
+        -------
+        """
+        # pylint: disable=super-init-not-called,protected-access
+        rows = np.asarray(rows, dtype=np.int64)
+        rows.flags.writeable = False
+        self._parent = parent
+        self._rows = rows
+        self._data = _GatheredColumns(parent._data, rows)
+        self._categories = parent._categories
+        self._date_views = {}
+        self._frame = None
+        self._segment_index = {}
+        # the view rows before each of the parent's period offsets
+        self._build_period_index(np.searchsorted(rows, parent._offsets))
+        self.simulations = parent.simulations
+
+    @property
+    def plt(self):
+        """ DataFrame of the selected rows, as for a PLT. A view cannot be assigned to. """
+        return PLT.plt.fget(self)
+
+    @property
+    def rows(self):
+        """ Row numbers of the parent PLT in the view """
+        return self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _view(self, rows):
+        return PLTView(self._parent, self._rows[rows])
+
+
+class _FrameView(pd.DataFrame):
+    """ DataFrame view of PLT columns, which raises on column assignment rather than
+    silently leaving the PLT unchanged. Frames derived from it are plain DataFrames. """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def __setitem__(self, key, value):
+        raise TypeError("Columns cannot be assigned on the DataFrame view of a PLT. "
+                        "Assign a new DataFrame to plt to replace the data")
+
+
+class _GatheredColumns(Mapping):
+    """ Columns of selected rows, gathered from the parent columns on first access """
+
+    def __init__(self, columns, rows):
+        self._columns = columns
+        self._rows = rows
+        self._gathered = {}
+
+    def __getitem__(self, name):
+        if name not in self._gathered:
+            values = self._columns[name][self._rows]
+            values.flags.writeable = False
+            self._gathered[name] = values
+        return self._gathered[name]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+
+def _as_columns(data):
+    if isinstance(data, PLT):
+        return data.plt
+    if isinstance(data, (pd.DataFrame, Mapping)):
+        return data
+    return pd.DataFrame(data)
+
+
+def _to_days(values):
+    """ Converts a date column to int32 days since the epoch. Numeric columns are taken
+        to already be days and unparseable dates are stored as MISSING_DATE.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype('datetime64[D]')
+        missing = np.isnat(days)
+        days = days.astype(np.int64)
+    elif np.issubdtype(values.dtype, np.integer):
+        missing = np.zeros(len(values), dtype=bool)
+        days = values
+    elif np.issubdtype(values.dtype, np.number):
+        missing = np.isnan(values)
+        days = np.floor(np.where(missing, 0, values)).astype(np.int64)
+    else:
+        # Dates repeat heavily in a PLT so only the distinct values are parsed
+        codes, uniques = pd.factorize(values)
+        parsed = _parse_dates(np.asarray(uniques, dtype=object))
+        unique_days = np.append(parsed.astype('datetime64[D]'), np.datetime64('NaT', 'D'))
+        # code -1 (a missing value) picks up the trailing NaT
+        missing = np.isnat(unique_days)[codes]
+        days = np.where(missing, 0, unique_days.astype(np.int64)[codes])
+    days = days.astype(np.int32)
+    if missing.any():
+        days[missing] = MISSING_DATE
+    return days
+
+
+def _encode_segment(values):
+    """ Dictionary encodes a segment column as int32 codes into its sorted categories """
+    codes, categories = pd.factorize(values, sort=True)
+    categories = np.asarray(categories, dtype=object)
+    categories.flags.writeable = False
+    return codes.astype(np.int32), categories
+
+
+def _parse_dates(values):
+    if int(pd.__version__.split(".")[0]) >= 2:
+        parsed = pd.to_datetime(values, format="mixed", errors="coerce")
+    else:
+        parsed = pd.to_datetime(values, errors="coerce")
+    return np.asarray(parsed, dtype='datetime64[ns]')
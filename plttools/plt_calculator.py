@@ -2,19 +2,38 @@
 A happy place for PLT calculator functions.
 """
 
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import NamedTuple
 import pandas as pd
 import numpy as np
 from plttools import ep_curve, PLT
+from plttools.shared import SharedPLTs
 
 
-def calculate_oep_curve(plt, number_of_simulations):
+class PLTSummary(NamedTuple):
+    """ Summary metrics of a PLT. The EP and TCE dictionaries map the probabilities of the
+    standard return periods (EPCurve.RETURN_PERIODS) to losses """
+    aal: float
+    standard_deviation: float
+    cv: float
+    oep: dict
+    aep: dict
+    oep_tce: dict
+    aep_tce: dict
+
+
+def calculate_oep_curve(plt, number_of_simulations, workers=None):
     """ This function calculates the OEP of a given PLT over a set number of simulations
     Parameters
     ----------
-    plt : pandas dataframe containing PLT
+    plt : PLT or pandas dataframe containing PLT
     number_of_simulations :
         Number of simulation periods. Important to supply as cannot assume
         that the max number of periods is the number of simulation periods
+    workers :
+        Number of threads aggregating contiguous PeriodId ranges, only for a PLT as a
+        dataframe has no period index. The curve is identical to the serial curve of the PLT
 
     Returns
     -------
@@ -22,22 +41,26 @@ def calculate_oep_curve(plt, number_of_simulations):
         An exceedance probability curve for the occurrence of a single event in a given year
 
     """
-    complete_plt = _fill_plt_empty_periods(plt, number_of_simulations)
-    max_period_losses = complete_plt.groupby(
-        'PeriodId').max().fillna(0).sort_values(by=['Loss'])
-    max_period_losses = _calculate_probabilities_for_period_losses(
-        max_period_losses)
-    return ep_curve.EPCurve(max_period_losses, ep_type=ep_curve.EPType.OEP)
+    _check_workers(plt, workers)
+    if isinstance(plt, PLT):
+        max_losses = plt.dense_period_losses(np.maximum, number_of_simulations, workers)
+    else:
+        max_losses = dense_max_occurrence_losses(
+            *_period_loss_columns(plt), number_of_simulations)
+    return calculate_ep_curve(max_losses, ep_curve.EPType.OEP)
 
 
-def calculate_aep_curve(plt, number_of_simulations):
+def calculate_aep_curve(plt, number_of_simulations, workers=None):
     """ This function calculates the AEP of a given PLT over a set number of simulations
     Parameters
     ----------
-    plt : pandas dataframe containing PLT
+    plt : PLT or pandas dataframe containing PLT
     number_of_simulations :
         Number of simulation periods. Important to supply as cannot assume
         that the max number of periods is the number of simulation periods
+    workers :
+        Number of threads aggregating contiguous PeriodId ranges, only for a PLT as a
+        dataframe has no period index. The curve is identical to the serial curve of the PLT
 
     Returns
     -------
@@ -45,46 +68,353 @@ def calculate_aep_curve(plt, number_of_simulations):
         An exceedance probability curve for the aggregate losses in a given year
 
     """
-    complete_plt = _fill_plt_empty_periods(plt, number_of_simulations)
-    sum_period_losses = complete_plt.groupby(
-        'PeriodId').sum().fillna(0).sort_values(by=['Loss'])
-    sum_period_losses = _calculate_probabilities_for_period_losses(
-        sum_period_losses)
-    return ep_curve.EPCurve(sum_period_losses, ep_type=ep_curve.EPType.AEP)
+    _check_workers(plt, workers)
+    if isinstance(plt, PLT):
+        sum_losses = plt.dense_period_losses(np.add, number_of_simulations, workers)
+    else:
+        sum_losses = dense_annual_losses(
+            *_period_loss_columns(plt), number_of_simulations)
+    return calculate_ep_curve(sum_losses, ep_curve.EPType.AEP)
+
+
+def summarize(plt, number_of_simulations=None, workers=None):
+    """ This function calculates the summary metrics of a PLT from a single aggregation
+    Parameters
+    ----------
+    plt : PLT or pandas dataframe containing PLT
+    number_of_simulations :
+        Number of simulation periods. Defaults to the simulations of a PLT, required
+        for a dataframe
+    workers :
+        Number of threads aggregating contiguous PeriodId ranges, only for a PLT as a
+        dataframe has no period index. The metrics are identical to the serial metrics of the PLT
+
+    Returns
+    -------
+    PLTSummary :
+        AAL, standard deviation, CV and the standard return period OEP, AEP and TCEs. The
+        AAL counts every loss, as PLT.get_aal; the other metrics are over the simulation
+        periods
+
+    """
+    _check_workers(plt, workers)
+    if isinstance(plt, PLT):
+        if number_of_simulations is None:
+            number_of_simulations = plt.simulations
+        total_losses = plt.losses.sum()
+        annual_losses = plt.dense_period_losses(np.add, number_of_simulations, workers)
+        max_losses = plt.dense_period_losses(np.maximum, number_of_simulations, workers)
+    else:
+        if number_of_simulations is None:
+            raise ValueError("number_of_simulations is required for a dataframe")
+        period_ids, losses = _period_loss_columns(plt)
+        total_losses = np.sum(losses)
+        annual_losses = dense_annual_losses(
+            period_ids, losses, number_of_simulations)
+        max_losses = dense_max_occurrence_losses(
+            period_ids, losses, number_of_simulations)
+
+    # every loss, as PLT.get_aal, including periods above the number of simulations
+    aal = total_losses / number_of_simulations
+    standard_deviation = pd.Series(annual_losses).std()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cv = np.float64(standard_deviation) / aal
+
+    return_periods = ep_curve.EPCurve.RETURN_PERIODS
+    probabilities = [1 / return_period for return_period in return_periods]
+    oep = calculate_ep_curve(max_losses, ep_curve.EPType.OEP)
+    aep = calculate_ep_curve(annual_losses, ep_curve.EPType.AEP)
+    return PLTSummary(
+        aal=aal,
+        standard_deviation=standard_deviation,
+        cv=cv,
+        oep=oep.get_standard_return_period_ep(),
+        aep=aep.get_standard_return_period_ep(),
+        oep_tce=dict(zip(probabilities, oep.tce_losses_at_return_periods(return_periods))),
+        aep_tce=dict(zip(probabilities, aep.tce_losses_at_return_periods(return_periods))))
+
+
+def calculate_ep_curve(period_losses, ep_type):
+    """ This function calculates an EP curve from dense period losses
+    Parameters
+    ----------
+    period_losses : array of the loss in every simulation period, including zeros
+    ep_type : EPType of the period losses (OEP for max occurrence, AEP for annual)
+
+    Returns
+    -------
+    EPCurve :
+        An exceedance probability curve where the i-th largest loss has probability i / n
+
+    """
+    losses = np.sort(period_losses)
+    probabilities = np.arange(len(losses), 0, -1) / len(losses)
+    return ep_curve.EPCurve({'Probability': probabilities, 'Loss': losses}, ep_type=ep_type)
+
+
+def calculate_curves_parallel(plts, number_of_simulations=None, workers=None, chunksize=1):
+    """ This function calculates the OEP and AEP curves of many PLTs over a process pool
+    The PeriodId and Loss arrays of every PLT are copied once into a single SharedPLTs
+    block which the workers attach to in place, so no DataFrames are pickled and one
+    shared memory block is open however many PLTs there are.
+    Parameters
+    ----------
+    plts : PLTs or pandas dataframes containing PLTs
+    number_of_simulations :
+        Number of simulation periods of every PLT. Defaults to the simulations of each PLT,
+        required for dataframes
+    workers :
+        Number of worker processes, defaults to the number of CPUs
+    chunksize :
+        Number of PLTs sent to a worker at a time
+
+    Returns
+    -------
+    list :
+        (OEP EPCurve, AEP EPCurve) of each PLT, in the order of plts
+
+    """
+    plts = [_as_plt(plt, number_of_simulations) for plt in plts]
+    simulations = [plt.simulations if number_of_simulations is None else number_of_simulations
+                   for plt in plts]
+    with SharedPLTs(plts, columns=["PeriodId", "Loss"], index=False) as shared_plts:
+        tasks = list(zip(shared_plts, simulations))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_process_context()) as pool:
+            return list(pool.map(_calculate_shared_curves, tasks, chunksize=chunksize))
+
+
+def return_period_losses(period_losses, return_periods=None):
+    """ This function calculates the EP losses at return periods for many dense period loss
+    vectors at once, equal to calculate_ep_curve(row).losses_at_return_periods(return_periods)
+    for each row
+    Parameters
+    ----------
+    period_losses : array of dense period losses, or a 2-D array with one vector per row
+    return_periods : return periods, defaulting to EPCurve.RETURN_PERIODS
+
+    Returns
+    -------
+    numpy.ndarray :
+        Losses at the return periods, with one row per row of period_losses
+
+    """
+    if return_periods is None:
+        return_periods = ep_curve.EPCurve.RETURN_PERIODS
+    return_periods = np.asarray(return_periods, dtype=np.float64)
+    if not np.all(return_periods > 0):
+        raise ValueError("return_periods must be positive")
+    period_losses = np.atleast_2d(period_losses)
+    number_of_simulations = period_losses.shape[1]
+    probabilities = 1 / return_periods
+    # the curve of every row shares the probabilities k / n, plus the max loss at tiny
+    curve_probabilities = np.concatenate((
+        [np.finfo(float).tiny],
+        np.arange(1, number_of_simulations + 1) / number_of_simulations))
+    sorted_losses = np.sort(period_losses, axis=1)[:, ::-1]
+    losses = np.empty((len(period_losses), len(probabilities)))
+    for row, row_losses in enumerate(sorted_losses):
+        curve_losses = np.concatenate(([row_losses[0]], row_losses))
+        losses[row] = np.interp(probabilities, curve_probabilities, curve_losses)
+    return losses
+
+
+def metric_cube(plt, by, number_of_simulations=None, return_periods=None):
+    """ This function calculates the metrics of every combination of segments of a PLT
+    The annual and max occurrence losses of every segment combination and period are
+    scattered into two (segment x period) matrices in one pass over the rows, and the
+    metrics of all the segments are then calculated column-wise on the matrices.
+    Parameters
+    ----------
+    plt : PLT, or a dataframe with the segment columns
+    by : segment columns to group by, e.g. ["Peril", "Country"]
+    number_of_simulations :
+        Number of simulation periods. Defaults to the simulations of the PLT
+    return_periods : return periods of the OEP and AEP, defaulting to EPCurve.RETURN_PERIODS
+
+    Returns
+    -------
+    pandas.DataFrame :
+        One row per segment combination with losses, sorted by the segments, with the
+        segment columns, AAL, StandardDeviation, CV and an OEP_<rp> and AEP_<rp> column
+        per return period
+
+    """
+    if isinstance(by, str):
+        by = [by]
+    plt = _as_plt(plt, number_of_simulations)
+    if number_of_simulations is None:
+        number_of_simulations = plt.simulations
+    if return_periods is None:
+        return_periods = ep_curve.EPCurve.RETURN_PERIODS
+    categories = [plt.categories(name) for name in by]
+    period_ids = plt.period_ids
+    in_range = (period_ids >= 1) & (period_ids <= number_of_simulations)
+    # one key per combination of codes, with room for the missing code -1
+    keys = np.ravel_multi_index(
+        [plt.column(name)[in_range].astype(np.int64) + 1 for name in by],
+        [len(values) + 1 for values in categories])
+    segment_keys, segments = np.unique(keys, return_inverse=True)
+    cells = segments * number_of_simulations + period_ids[in_range] - 1
+    shape = (len(segment_keys), number_of_simulations)
+    losses = plt.losses[in_range]
+    # the cells as the periods of one long simulation through every segment
+    cells, size = cells + 1, shape[0] * shape[1]
+    annual_losses = dense_annual_losses(cells, losses, size).reshape(shape)
+    max_losses = dense_max_occurrence_losses(cells, losses, size).reshape(shape)
+
+    cube = {}
+    segment_codes = np.unravel_index(segment_keys, [len(values) + 1 for values in categories])
+    for name, values, codes in zip(by, categories, segment_codes):
+        # a writable copy, as older pandas cannot hash read-only categories
+        cube[name] = pd.Categorical.from_codes(codes - 1, values.copy())
+    cube["AAL"] = annual_losses.sum(axis=1) / number_of_simulations
+    cube["StandardDeviation"] = annual_losses.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cube["CV"] = cube["StandardDeviation"] / cube["AAL"]
+    oep = return_period_losses(max_losses, return_periods)
+    aep = return_period_losses(annual_losses, return_periods)
+    for column, return_period in enumerate(return_periods):
+        cube["OEP_{0}".format(return_period)] = oep[:, column]
+    for column, return_period in enumerate(return_periods):
+        cube["AEP_{0}".format(return_period)] = aep[:, column]
+    return pd.DataFrame(cube)
 
 
-def group_plts(plt1, plt2):
-    """ This function groups two PLTs together
+def group_plts(*plts):
+    """ This function groups any number of PLTs together, summing the losses of the same
+    occurrence (PeriodId, EventId, EventDate, LossDate) in one pass
     Parameters
     ----------
-    plt1 : pandas dataframe containing PLT
-    plt2 : pandas dataframe containing PLT
+    plts : PLTs
 
     Returns
     -------
     plt :
-        A pandas dataframe containing a PLT
+        A PLT with one row per occurrence, over the largest number of simulations of the
+        grouped PLTs. Optional columns are not carried over
+
+    """
+    if not plts:
+        raise ValueError("At least one PLT is required to group")
+    plts = [plt if isinstance(plt, PLT) else PLT(plt) for plt in plts]
+    key_columns = ["PeriodId", "EventId", "EventDate", "LossDate"]
+    keys = {name: np.concatenate([plt.column(name) for plt in plts])
+            for name in key_columns}
+    losses = np.concatenate([plt.losses for plt in plts])
+
+    # the dates are int days, so a single sort on the integer keys groups every occurrence
+    order = np.lexsort([keys[name] for name in reversed(key_columns)])
+    keys = {name: values[order] for name, values in keys.items()}
+    if len(order):
+        new_key = np.zeros(len(order), dtype=bool)
+        new_key[0] = True
+        for values in keys.values():
+            new_key[1:] |= values[1:] != values[:-1]
+        starts = np.flatnonzero(new_key)
+        grouped_losses = np.add.reduceat(losses[order], starts)
+    else:
+        starts = order
+        grouped_losses = losses
+    data = {name: values[starts] for name, values in keys.items()}
+    data["Loss"] = grouped_losses
+    simulations = max(plt.simulations for plt in plts)
+    return PLT._from_columns(data, simulations)  # pylint: disable=protected-access
+
+
+def dense_annual_losses(period_ids, losses, number_of_simulations):
+    """ This function scatters losses into a dense vector of annual losses
+    Parameters
+    ----------
+    period_ids : array of PeriodIds
+    losses : array of losses, aligned with period_ids
+    number_of_simulations :
+        Number of simulation periods
+
+    Returns
+    -------
+    numpy.ndarray :
+        Total loss of each period where index i holds period i + 1, zero for
+        empty periods. Periods outside 1..number_of_simulations are excluded
+
+    """
+    period_ids, losses = _in_simulation_range(
+        period_ids, losses, number_of_simulations)
+    return np.bincount(period_ids, weights=losses,
+                       minlength=number_of_simulations + 1)[1:]
+
+
+def dense_max_occurrence_losses(period_ids, losses, number_of_simulations):
+    """ This function scatters losses into a dense vector of max occurrence losses
+    Parameters
+    ----------
+    period_ids : array of PeriodIds
+    losses : array of losses, aligned with period_ids
+    number_of_simulations :
+        Number of simulation periods
+
+    Returns
+    -------
+    numpy.ndarray :
+        Largest single loss of each period where index i holds period i + 1, zero for
+        empty periods. Periods outside 1..number_of_simulations are excluded
 
     """
-    grouped_plt = pd.concat([plt1.plt, plt2.plt], axis=0)
-    concatenated_plt = grouped_plt.groupby(['PeriodId',
-                                            'EventId',
-                                            'EventDate',
-                                            'LossDate'], observed=True).sum().reset_index()
-    return PLT(concatenated_plt)
-
-
-def _calculate_probabilities_for_period_losses(period_losses):
-    period_losses['row'] = np.arange(len(period_losses))
-    period_losses['inv_row'] = len(period_losses) - period_losses['row']
-    period_losses['Probability'] = period_losses['inv_row'] * \
-        1/len(period_losses)
-    return period_losses
-
-
-def _fill_plt_empty_periods(plt, number_of_simulations):
-    plt_placeholder = []
-    for period in range(1, number_of_simulations + 1):
-        plt_placeholder.append(period)
-    placeholder = pd.DataFrame(plt_placeholder, columns=['PeriodId'])
-    return pd.merge(placeholder, plt, how='left', on=['PeriodId'])
+    return _empty_as_zero(_period_maxima(period_ids, losses, number_of_simulations))
+
+
+def _in_simulation_range(period_ids, losses, number_of_simulations):
+    period_ids = np.asarray(period_ids, dtype=np.int64)
+    losses = np.asarray(losses, dtype=np.float64)
+    in_range = (period_ids >= 1) & (period_ids <= number_of_simulations)
+    if not in_range.all():
+        period_ids, losses = period_ids[in_range], losses[in_range]
+    return period_ids, losses
+
+
+def _period_maxima(period_ids, losses, number_of_simulations):
+    """ Largest loss of each period where index i holds period i + 1, -inf for empty
+    periods, so maxima of separate chunks can be folded together """
+    period_ids, losses = _in_simulation_range(
+        period_ids, losses, number_of_simulations)
+    max_losses = np.full(number_of_simulations + 1, -np.inf)
+    np.maximum.at(max_losses, period_ids, losses)
+    return max_losses[1:]
+
+
+def _empty_as_zero(max_losses):
+    return np.where(np.isneginf(max_losses), 0.0, max_losses)
+
+
+def _process_context():
+    # forking a process that has started threads can deadlock the workers
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _calculate_shared_curves(task):
+    shared_plt, number_of_simulations = task
+    plt = shared_plt.attach()
+    plt.simulations = number_of_simulations
+    return (calculate_ep_curve(plt.max_occurrence_losses, ep_curve.EPType.OEP),
+            calculate_ep_curve(plt.annual_losses, ep_curve.EPType.AEP))
+
+
+def _as_plt(plt, number_of_simulations):
+    if isinstance(plt, PLT):
+        return plt
+    return PLT(plt, number_of_simulations)
+
+
+def _check_workers(plt, workers):
+    if workers is not None and not isinstance(plt, PLT):
+        raise ValueError("workers requires a PLT, create one from the dataframe first")
+
+
+def _period_loss_columns(plt):
+    if not isinstance(plt, (pd.DataFrame, dict)):
+        plt = pd.DataFrame(plt)
+    if 'PeriodId' not in plt or 'Loss' not in plt:
+        raise ValueError("PeriodId, Loss fields not in data. Check the spelling")
+    return plt['PeriodId'], plt['Loss']
+
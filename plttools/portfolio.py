@@ -0,0 +1,186 @@
+""" Portfolio
+Incremental accumulation of a portfolio of PLTs.
+"""
+
+import numpy as np
+import pandas as pd
+from plttools import ep_curve, plt_calculator, PLT
+
+
+class PortfolioAccumulator:
+    """ Portfolio Accumulator
+    Holds the dense annual losses of a portfolio and its losses per occurrence
+    (PeriodId, EventId, EventDate, LossDate), the same key as plt_calculator.group_plts.
+    PLTs are added and removed in time proportional to their own size, and the AAL,
+    standard deviation, OEP and AEP (and from those the TCEs) of the current portfolio are
+    calculated on demand.
+    """
+
+    def __init__(self, number_of_simulations: int):
+        """ Type initialiser for Portfolio Accumulator
+
+        Parameters
+        ----------
+        number_of_simulations:
+            type(int)
+            Number of simulation periods. Losses outside periods 1..number_of_simulations
+            are ignored
+
+        Returns
+        -------
+        """
+        self.simulations = number_of_simulations
+        self._annual_losses = np.zeros(number_of_simulations, dtype=np.float64)
+        self._annual_rows = np.zeros(number_of_simulations, dtype=np.int64)
+        self._occurrences = {}
+        self._free_slots = []
+        self._occurrence_periods = np.zeros(0, dtype=np.int32)
+        self._occurrence_losses = np.zeros(0, dtype=np.float64)
+        self._occurrence_rows = np.zeros(0, dtype=np.int64)
+
+    def add(self, plt):
+        """ Adds a PLT to the portfolio
+
+        Parameters
+        ----------
+        plt:
+            type(PLT)
+
+        Returns
+        -------
+        """
+        period_ids, losses, keys = self._occurrence_keys(plt)
+        slots = np.fromiter((self._slot(key) for key in keys), dtype=np.int64, count=len(keys))
+        self._occurrence_periods[slots] = period_ids
+        self._accumulate(period_ids, slots, losses, 1)
+
+    def remove(self, plt):
+        """ Removes a PLT that was previously added from the portfolio
+
+        Parameters
+        ----------
+        plt:
+            type(PLT)
+
+        Returns
+        -------
+        """
+        period_ids, losses, keys = self._occurrence_keys(plt)
+        slots = np.fromiter((self._occurrences.get(key, -1) for key in keys),
+                            dtype=np.int64, count=len(keys))
+        removed_slots, removed_rows = np.unique(slots, return_counts=True)
+        if len(removed_slots) and (removed_slots[0] < 0 or np.any(
+                removed_rows > self._occurrence_rows[removed_slots])):
+            raise ValueError("PLT occurrences are not in the portfolio")
+        self._accumulate(period_ids, slots, -losses, -1)
+        # free the slots of occurrences no longer in the portfolio for reuse
+        for key, slot in zip(keys, slots.tolist()):
+            if self._occurrence_rows[slot] == 0 and self._occurrences.pop(key, None) is not None:
+                self._free_slots.append(slot)
+
+    @property
+    def annual_losses(self):
+        """ Dense vector of the total portfolio loss in each simulation period """
+        return self._annual_losses.copy()
+
+    @property
+    def max_occurrence_losses(self):
+        """ Dense vector of the largest portfolio occurrence loss in each simulation period """
+        occupied = self._occurrence_rows > 0
+        return plt_calculator.dense_max_occurrence_losses(
+            self._occurrence_periods[occupied], self._occurrence_losses[occupied],
+            self.simulations)
+
+    def get_aal(self):
+        """ Retrieves the AAL of the portfolio
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The average annual loss = total annual losses / number of simulations
+        """
+        return self._annual_losses.sum() / self.simulations
+
+    def get_standard_deviation(self):
+        """ Retrieves the standard deviation of the portfolio annual losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The standard deviation of the annual losses over every simulation period
+        """
+        return pd.Series(self._annual_losses).std()
+
+    def calculate_oep_curve(self):
+        """ Calculates the OEP curve of the portfolio
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        EPCurve
+        """
+        return plt_calculator.calculate_ep_curve(
+            self.max_occurrence_losses, ep_curve.EPType.OEP)
+
+    def calculate_aep_curve(self):
+        """ Calculates the AEP curve of the portfolio
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        EPCurve
+        """
+        return plt_calculator.calculate_ep_curve(
+            self._annual_losses, ep_curve.EPType.AEP)
+
+    def _occurrence_keys(self, plt):
+        if not isinstance(plt, PLT):
+            plt = PLT(plt, self.simulations)
+        period_ids = plt.period_ids
+        in_range = (period_ids >= 1) & (period_ids <= self.simulations)
+        keys = plt.occurrence_keys()[in_range].tolist()
+        return period_ids[in_range], plt.losses[in_range], keys
+
+    def _slot(self, key):
+        slot = self._occurrences.get(key)
+        if slot is None:
+            slot = self._free_slots.pop() if self._free_slots else len(self._occurrences)
+            self._occurrences[key] = slot
+            self._reserve(slot + 1)
+        return slot
+
+    def _reserve(self, size):
+        capacity = len(self._occurrence_losses)
+        if size > capacity:
+            capacity = max(size, 2 * capacity)
+            self._occurrence_periods = _grow(self._occurrence_periods, capacity)
+            self._occurrence_losses = _grow(self._occurrence_losses, capacity)
+            self._occurrence_rows = _grow(self._occurrence_rows, capacity)
+
+    def _accumulate(self, period_ids, slots, losses, rows):
+        periods = period_ids - 1
+        np.add.at(self._annual_losses, periods, losses)
+        np.add.at(self._annual_rows, periods, rows)
+        np.add.at(self._occurrence_losses, slots, losses)
+        np.add.at(self._occurrence_rows, slots, rows)
+        # reset emptied periods and occurrences exactly, free of rounding residue
+        emptied_periods = periods[self._annual_rows[periods] == 0]
+        self._annual_losses[emptied_periods] = 0
+        emptied_slots = slots[self._occurrence_rows[slots] == 0]
+        self._occurrence_losses[emptied_slots] = 0
+
+
+def _grow(values, capacity):
+    grown = np.zeros(capacity, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
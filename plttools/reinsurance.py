@@ -0,0 +1,311 @@
+""" Reinsurance
+Vectorised application of reinsurance layer terms to PLTs.
+"""
+
+from collections.abc import Mapping
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from plttools import ep_curve, plt_calculator, PLT
+from plttools.plt import MISSING_DATE
+from plttools.plt_calculator import _as_plt
+
+LAYER_TERMS = {"OccRetention": 0.0, "OccLimit": np.inf, "AggRetention": 0.0, "AggLimit": np.inf}
+
+
+class Reinstatements(NamedTuple):
+    """ Recoveries of a layer with reinstatements. The PLT has the recovery of each row as
+    its Loss and the reinstatement premium due on it as a ReinstatementPremium column, and
+    the dense vectors hold the totals of each simulation period """
+    plt: PLT
+    recoveries: np.ndarray
+    reinstatement_premiums: np.ndarray
+
+
+def apply_layer(plt, occ_retention=0.0, occ_limit=np.inf, agg_retention=0.0, agg_limit=np.inf,
+                date_column="LossDate", number_of_simulations=None):
+    """ This function applies per occurrence and annual aggregate layer terms to a PLT
+    Each loss is first limited to the occurrence layer. The occurrence layer losses of each
+    period are then accumulated in date order and the aggregate retention and limit are
+    applied to the running total, so the aggregate terms are eroded chronologically.
+    Parameters
+    ----------
+    plt : PLT or pandas dataframe containing PLT
+    occ_retention : per occurrence retention
+    occ_limit : per occurrence limit, unlimited by default
+    agg_retention : annual aggregate retention (deductible)
+    agg_limit : annual aggregate limit, unlimited by default
+    date_column :
+        "LossDate" or "EventDate", the order losses erode the aggregate terms in a period.
+        Rows without a date come first and rows on the same date keep their order
+    number_of_simulations :
+        Number of simulation periods, required for a dataframe
+
+    Returns
+    -------
+    PLT :
+        The same rows with the Loss of each row to the layer. Its annual losses are
+        min(max(sum of occurrence layer losses - agg_retention, 0), agg_limit), and its
+        curves are calculated with calculate_oep_curve and calculate_aep_curve
+
+    """
+    _check_terms(occ_retention, occ_limit, agg_retention, agg_limit)
+    plt = _as_plt(plt, number_of_simulations)
+    order, starts = _chronological_order(plt, date_column)
+    occurrence_losses = _occurrence_layer(plt.losses[order], occ_retention, occ_limit)
+    layered = np.empty(len(plt), dtype=np.float64)
+    layered[order] = _aggregate_layer(occurrence_losses, starts, agg_retention, agg_limit)
+    columns = plt.columns()
+    columns["Loss"] = layered
+    return PLT._from_columns(  # pylint: disable=protected-access
+        columns, plt.simulations, plt.period_offsets, _categories(plt, columns))
+
+
+def evaluate_layers(plt, layers, number_of_simulations=None, return_periods=None,
+                    date_column="LossDate", chunk_size=2 ** 22):
+    """ This function evaluates many layers against the same PLT in one pass
+    The losses are ordered by period and date once, and the layer losses of every layer are
+    calculated together as a (layer x loss) array, a block of whole periods at a time.
+    Parameters
+    ----------
+    plt : PLT or pandas dataframe containing PLT
+    layers :
+        Layer terms as a dataframe, a dict of columns or a list of dicts, with any of the
+        LAYER_TERMS columns OccRetention, OccLimit, AggRetention and AggLimit. Missing
+        (or NaN) terms default to no retention and an unlimited limit
+    number_of_simulations :
+        Number of simulation periods. Defaults to the simulations of a PLT, required
+        for a dataframe
+    return_periods : return periods of the OEP and AEP, defaulting to EPCurve.RETURN_PERIODS
+    date_column :
+        "LossDate" or "EventDate", the order losses erode the aggregate terms in a period
+    chunk_size :
+        Approximate number of (layer x loss) values calculated at a time
+
+    Returns
+    -------
+    pandas.DataFrame :
+        One row per layer, indexed by Layer, with the layer terms, ExpectedLoss,
+        StandardDeviation, AttachmentProbability (of an annual layer loss),
+        ExhaustionProbability (of the aggregate limit, or of the occurrence limit for
+        layers without an aggregate limit) and an OEP_<rp> and AEP_<rp> column per
+        return period
+
+    """
+    terms = _layer_terms(layers)
+    _check_terms(terms.to_numpy())
+    plt = _as_plt(plt, number_of_simulations)
+    if number_of_simulations is None:
+        number_of_simulations = plt.simulations
+    if return_periods is None:
+        return_periods = ep_curve.EPCurve.RETURN_PERIODS
+    occ_retention, occ_limit, agg_retention, agg_limit = (
+        terms[name].to_numpy()[:, np.newaxis] for name in LAYER_TERMS)
+
+    order, _ = _chronological_order(plt, date_column)
+    period_ids = plt.period_ids[order]
+    in_range = (period_ids >= 1) & (period_ids <= number_of_simulations)
+    losses = plt.losses[order][in_range]
+    period_ids = period_ids[in_range]
+    starts = np.flatnonzero(np.diff(period_ids, prepend=-1))
+    periods = period_ids[starts] - 1
+
+    shape = (len(terms), number_of_simulations)
+    gross_annual_losses = np.zeros(shape)
+    max_losses = np.zeros(shape)
+    rows_per_chunk = max(chunk_size // max(len(terms), 1), 1)
+    bounds = np.append(starts, len(losses))
+    first = 0
+    while first < len(starts):
+        # whole periods of at most rows_per_chunk rows, or one larger period
+        row_start = starts[first]
+        last = max(np.searchsorted(bounds, row_start + rows_per_chunk, side='right') - 1,
+                   first + 1)
+        row_end = bounds[last]
+        chunk_starts = starts[first:last] - row_start
+        occurrence_losses = _occurrence_layer(
+            losses[np.newaxis, row_start:row_end], occ_retention, occ_limit)
+        layered = _aggregate_layer(occurrence_losses, chunk_starts, agg_retention, agg_limit)
+        gross_annual_losses[:, periods[first:last]] = np.add.reduceat(
+            occurrence_losses, chunk_starts, axis=1)
+        max_losses[:, periods[first:last]] = np.maximum.reduceat(
+            layered, chunk_starts, axis=1)
+        first = last
+
+    # the aggregate terms on the annual occurrence layer losses, free of rounding
+    annual_losses = np.clip(gross_annual_losses - agg_retention, 0, agg_limit)
+    gross_max_losses = plt.dense_period_losses(np.maximum, number_of_simulations)
+    exhausted = np.where(np.isfinite(agg_limit),
+                         gross_annual_losses - agg_retention >= agg_limit,
+                         np.isfinite(occ_limit) & (gross_max_losses - occ_retention >= occ_limit))
+    evaluated = terms.copy()
+    evaluated["ExpectedLoss"] = annual_losses.sum(axis=1) / number_of_simulations
+    evaluated["StandardDeviation"] = annual_losses.std(axis=1, ddof=1)
+    evaluated["AttachmentProbability"] = np.count_nonzero(
+        annual_losses > 0, axis=1) / number_of_simulations
+    evaluated["ExhaustionProbability"] = np.count_nonzero(
+        exhausted, axis=1) / number_of_simulations
+    oep = plt_calculator.return_period_losses(max_losses, return_periods)
+    aep = plt_calculator.return_period_losses(annual_losses, return_periods)
+    for column, return_period in enumerate(return_periods):
+        evaluated["OEP_{0}".format(return_period)] = oep[:, column]
+    for column, return_period in enumerate(return_periods):
+        evaluated["AEP_{0}".format(return_period)] = aep[:, column]
+    return evaluated
+
+
+def apply_reinstatements(plt, occ_retention, occ_limit, reinstatements, rates=1.0, premium=0.0,
+                         agg_retention=0.0, time_pro_rata=False, date_column="LossDate",
+                         number_of_simulations=None):
+    """ This function calculates the recoveries and reinstatement premiums of a layer with
+    a limited number of reinstatements, e.g. a cat XL
+    The layer covers occ_limit per occurrence and (reinstatements + 1) * occ_limit in a
+    period. Losses are ordered once by period and date, and the recovered and reinstated
+    amounts of every period are running totals from one segmented cumulative sum.
+    Parameters
+    ----------
+    plt : PLT or pandas dataframe containing PLT
+    occ_retention : per occurrence retention
+    occ_limit : per occurrence limit
+    reinstatements : number of reinstatements of the limit
+    rates :
+        Premium rate of each reinstatement as a fraction of the premium, either one rate for
+        all or a rate per reinstatement, e.g. [1.0, 0.5]. Premium is due pro rata to the
+        amount of the limit reinstated
+    premium : premium of the layer that the reinstatement rates apply to
+    agg_retention : annual aggregate retention (deductible)
+    time_pro_rata :
+        If True the premium of a reinstatement is also pro rata to the rest of the year
+        from the loss date. Rows without a date pay in full
+    date_column : "LossDate" or "EventDate", the order losses erode the layer in a period
+    number_of_simulations :
+        Number of simulation periods. Defaults to the simulations of a PLT, required
+        for a dataframe
+
+    Returns
+    -------
+    Reinstatements :
+        The PLT of recoveries with the ReinstatementPremium of each row, and the dense
+        recoveries and reinstatement premiums of each simulation period
+
+    """
+    _check_terms(occ_retention, occ_limit, agg_retention, reinstatements, premium)
+    if not np.isfinite(occ_limit) or occ_limit == 0:
+        raise ValueError("occ_limit must be positive and finite")
+    if int(reinstatements) != reinstatements:
+        raise ValueError("reinstatements must be a whole number")
+    rates = np.asarray(rates, dtype=np.float64)
+    if rates.ndim > 1 or rates.ndim == 1 and len(rates) != reinstatements:
+        raise ValueError("rates must be one rate or a rate per reinstatement, got {0} rates "
+                         "for {1} reinstatements".format(rates.size, int(reinstatements)))
+    if np.any(rates < 0):
+        raise ValueError("Reinstatement rates must not be negative")
+    rates = np.broadcast_to(rates, (int(reinstatements),))
+    plt = _as_plt(plt, number_of_simulations)
+    if number_of_simulations is None:
+        number_of_simulations = plt.simulations
+    agg_limit = (reinstatements + 1) * occ_limit
+
+    order, starts = _chronological_order(plt, date_column)
+    occurrence_losses = _occurrence_layer(plt.losses[order], occ_retention, occ_limit)
+    cumulative = _period_cumsum(occurrence_losses, starts) if len(starts) else \
+        occurrence_losses
+    recovered = np.clip(cumulative - agg_retention, 0, agg_limit)
+    recoveries = recovered - np.clip(
+        cumulative - occurrence_losses - agg_retention, 0, agg_limit)
+    # the i-th reinstatement restores the limit eroded between i - 1 and i limits
+    thresholds = occ_limit * np.arange(len(rates))
+    reinstated = np.clip(recovered[:, np.newaxis] - thresholds, 0, occ_limit) @ rates
+    premiums = np.diff(reinstated, prepend=0.0)
+    if len(starts):
+        premiums[starts] = reinstated[starts]
+    premiums *= premium / occ_limit
+    if time_pro_rata:
+        premiums *= _rest_of_year(plt.column(date_column)[order])
+
+    row_recoveries = np.empty(len(plt), dtype=np.float64)
+    row_recoveries[order] = recoveries
+    row_premiums = np.empty(len(plt), dtype=np.float64)
+    row_premiums[order] = premiums
+    columns = plt.columns()
+    columns["Loss"] = row_recoveries
+    columns["ReinstatementPremium"] = row_premiums
+    layered = PLT._from_columns(  # pylint: disable=protected-access
+        columns, plt.simulations, plt.period_offsets, _categories(plt, columns))
+    return Reinstatements(
+        plt=layered,
+        recoveries=layered.dense_period_losses(np.add, number_of_simulations),
+        reinstatement_premiums=plt_calculator.dense_annual_losses(
+            plt.period_ids, row_premiums, number_of_simulations))
+
+
+def _categories(plt, columns):
+    return {name: plt.categories(name) for name in columns if name in PLT.SEGMENT_COLUMNS}
+
+
+def _check_terms(*terms):
+    if np.any(np.asarray(terms, dtype=np.float64) < 0):
+        raise ValueError("Layer retentions and limits must not be negative")
+
+
+def _layer_terms(layers):
+    if not isinstance(layers, (pd.DataFrame, Mapping)):
+        layers = pd.DataFrame(list(layers))
+    layers = pd.DataFrame(layers)
+    unknown = [name for name in layers.columns if name not in LAYER_TERMS]
+    if unknown:
+        raise ValueError("Unknown layer terms {0}. Expected {1}".format(
+            ', '.join(map(str, unknown)), ', '.join(LAYER_TERMS)))
+    terms = pd.DataFrame({name: layers[name].astype(np.float64).fillna(default).to_numpy()
+                          if name in layers else np.full(len(layers), default)
+                          for name, default in LAYER_TERMS.items()}, index=layers.index)
+    terms.index.name = "Layer"
+    return terms
+
+
+def _chronological_order(plt, date_column):
+    """ Row order by period then date, and the first position of each period in it """
+    if date_column not in PLT.DATE_COLUMNS:
+        raise ValueError("date_column must be one of {0}".format(', '.join(PLT.DATE_COLUMNS)))
+    period_ids = plt.period_ids
+    order = np.lexsort((plt.column(date_column), period_ids))
+    starts = np.flatnonzero(np.diff(period_ids[order], prepend=-1))
+    return order, starts
+
+
+def _rest_of_year(days):
+    """ Fraction of the calendar year from each date to the end of its year """
+    dates = days.astype('datetime64[D]')
+    years = dates.astype('datetime64[Y]')
+    year_start = years.astype('datetime64[D]')
+    year_end = (years + np.timedelta64(1, 'Y')).astype('datetime64[D]')
+    rest = (year_end - dates) / (year_end - year_start)
+    return np.where(days == MISSING_DATE, 1.0, rest)
+
+
+def _occurrence_layer(losses, retention, limit):
+    return np.clip(losses - retention, 0, limit)
+
+
+def _period_cumsum(values, starts):
+    """ Cumulative sums along the last axis that restart at each period start, accumulated
+    within each period alone so no rounding carries over from earlier periods """
+    lengths = np.diff(np.append(starts, values.shape[-1]))
+    # rows along the first axis, so each step gathers whole rows of every layer
+    cumulative = np.array(np.moveaxis(values, -1, 0), dtype=np.float64, order='C')
+    # periods from the longest, so the periods with a row at each position are a prefix
+    by_length = np.argsort(-lengths, kind='stable')
+    period_starts, descending = starts[by_length], -lengths[by_length]
+    for position in range(1, lengths.max() if len(lengths) else 0):
+        rows = period_starts[:np.searchsorted(descending, -position)] + position
+        cumulative[rows] += cumulative[rows - 1]
+    return np.moveaxis(cumulative, 0, -1)
+
+
+def _aggregate_layer(losses, starts, retention, limit):
+    """ The part of each loss within the aggregate layer, from the running period total """
+    if len(starts) == 0 or (np.all(retention == 0) and np.all(np.isinf(limit))):
+        return losses
+    cumulative = _period_cumsum(losses, starts)
+    return np.clip(cumulative - retention, 0, limit) - \
+        np.clip(cumulative - losses - retention, 0, limit)
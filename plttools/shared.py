@@ -0,0 +1,206 @@
+""" Shared PLT
+Zero-copy transport of PLT arrays between processes through multiprocessing.shared_memory.
+"""
+
+from multiprocessing import shared_memory
+import numpy as np
+from plttools.plt import PLT
+
+ALIGNMENT = 64
+OFFSETS = "_offsets"
+
+
+class _SharedBlock:
+    """ Lifecycle of a shared memory block owned by the process that created it """
+
+    _block = None
+
+    def close(self):
+        """ Closes the owning process's view of the block """
+        if self._block is not None:
+            self._block.close()
+
+    def unlink(self):
+        """ Destroys the block. Attached processes keep their mappings until they close """
+        if self._block is not None:
+            self._block.unlink()
+            self._block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.unlink()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_block", None)
+        return state
+
+
+class SharedPLT(_SharedBlock):
+    """ Shared PLT
+    A picklable handle to the column arrays and period index of a PLT held in a shared
+    memory block, with the categories of its segment columns. The process that creates the
+    handle owns the block and releases it with close and unlink (or by using the handle as
+    a context manager). Other processes call attach to get a PLT that reads the block in
+    place.
+    """
+
+    def __init__(self, plt, columns=None, index=True):
+        """ Type initialiser for Shared PLT, copying the PLT into a new shared memory block.
+        Only numeric columns are shared, so optional string columns are left out.
+
+        Parameters
+        ----------
+        plt:
+            type(PLT)
+        columns:
+            type(list)
+            Optional columns to share, e.g. ["PeriodId", "Loss"]. All if None
+        index:
+            type(bool)
+            Whether to share the period offsets, which hold one value per PeriodId up to
+            the largest. Without them the index is rebuilt from PeriodId on attach
+
+        Returns
+        -------
+        """
+        self._block, (layout,) = _create_block([_shared_arrays(plt, columns, index)])
+        self._describe(self._block.name, layout, plt)
+
+    def _describe(self, name, layout, plt):
+        self.name = name
+        self.layout = layout
+        self.simulations = plt.simulations
+        self.categories = {entry[0]: plt.categories(entry[0]) for entry in layout
+                           if entry[0] in PLT.SEGMENT_COLUMNS}
+
+    def attach(self):
+        """ Attaches to the shared memory block, typically from another process.
+        The PLT keeps the block mapped while it is alive; arrays taken from it should not
+        outlive it.
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        PLT :
+            A read-only PLT over the shared arrays, without copying them
+        """
+        block = _attach(self.name)
+        arrays = {name: np.ndarray((length,), dtype=dtype, buffer=block.buf, offset=offset)
+                  for (name, dtype, offset, length) in self.layout}
+        offsets = arrays.pop(OFFSETS, None)
+        plt = PLT._from_columns(  # pylint: disable=protected-access
+            arrays, self.simulations, offsets, self.categories)
+        plt._shared_memory = block  # pylint: disable=protected-access
+        return plt
+
+
+class SharedPLTs(_SharedBlock):
+    """ Shared PLTs
+    Many PLTs packed into a single shared memory block, so sharing any number of PLTs takes
+    one file descriptor and mapping. Indexing gives a picklable SharedPLT handle to each
+    PLT, which is small to send to a worker. The block is owned and released as for a
+    SharedPLT.
+    """
+
+    def __init__(self, plts, columns=None, index=True):
+        """ Type initialiser for Shared PLTs, copying the PLTs into a new shared memory block
+
+        Parameters
+        ----------
+        plts:
+            type(list)
+            PLTs to share
+        columns:
+            type(list)
+            Optional columns to share, as for SharedPLT
+        index:
+            type(bool)
+            Whether to share the period offsets, as for SharedPLT
+
+        Returns
+        -------
+        """
+        plts = list(plts)
+        self._block, layouts = _create_block(
+            [_shared_arrays(plt, columns, index) for plt in plts])
+        self.name = self._block.name
+        self._handles = []
+        for plt, layout in zip(plts, layouts):
+            handle = SharedPLT.__new__(SharedPLT)
+            handle._describe(self.name, layout, plt)  # pylint: disable=protected-access
+            self._handles.append(handle)
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __getitem__(self, position):
+        return self._handles[position]
+
+    def __iter__(self):
+        return iter(self._handles)
+
+
+def _shared_arrays(plt, columns, index):
+    arrays = {name: values for name, values in plt.columns().items()
+              if (columns is None or name in columns)
+              and values.dtype != object and values.dtype.kind not in "US"}
+    if index:
+        arrays[OFFSETS] = plt.period_offsets
+    return arrays
+
+
+def _create_block(arrays_list):
+    """ One block holding every array, with a (name, dtype, offset, length) layout of the
+    arrays of each item """
+    layouts = []
+    size = 0
+    for arrays in arrays_list:
+        layout = []
+        for name, values in arrays.items():
+            layout.append((name, values.dtype.str, size, len(values)))
+            size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+        layouts.append(layout)
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for arrays, layout in zip(arrays_list, layouts):
+        for (name, dtype, offset, length) in layout:
+            np.ndarray((length,), dtype=dtype, buffer=block.buf,
+                       offset=offset)[:] = arrays[name]
+    return block, layouts
+
+
+class _AttachedMemory(shared_memory.SharedMemory):
+    """ A shared memory block attached by a non-owning process. The mapping stays open while
+    arrays over it are alive instead of failing to close when the block is collected. """
+
+    def __del__(self):
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+def _attach(name):
+    try:
+        return _AttachedMemory(name=name, track=False)
+    except TypeError:
+        # before Python 3.13 attaching registers the block with the resource tracker, which
+        # worker processes share with the owner. Registering is skipped rather than undone,
+        # as unregistering would drop the owner's registration
+        from multiprocessing import resource_tracker  # pylint: disable=import-outside-toplevel
+        register = resource_tracker.register
+
+        def register_other(resource, rtype):
+            if rtype != "shared_memory":
+                register(resource, rtype)
+
+        resource_tracker.register = register_other
+        try:
+            return _AttachedMemory(name=name)
+        finally:
+            resource_tracker.register = register
@@ -0,0 +1,233 @@
+""" EP Sketch
+Approximate EP curves in bounded memory from a mergeable quantile sketch of period losses.
+"""
+
+import numpy as np
+from plttools import ep_curve
+
+
+class EPSketch:
+    """ EP Sketch
+    A DDSketch style quantile sketch of period losses (annual or max occurrence losses).
+    Non-zero losses are counted in buckets whose bounds grow geometrically by
+    gamma = (1 + relative_accuracy) / (1 - relative_accuracy), and zero losses are counted
+    exactly. Sketches built from different chunks or workers with the same accuracy merge
+    into the sketch of all their losses.
+
+    Error bounds: each loss is represented within relative_accuracy of its true value, and
+    ranks are kept exactly, so every loss of the approximate EP curve, and with that every
+    EP loss interpolated from it, is within relative_accuracy of the exact curve at the same
+    probability. So are the TCEs of tce_losses_at_return_periods. The bound holds at the
+    tail regardless of the number of periods.
+    Once max_buckets is exceeded the buckets of the smallest losses are collapsed together,
+    so only the body of the curve below those losses loses accuracy.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        """ Type initialiser for EP Sketch
+
+        Parameters
+        ----------
+        relative_accuracy:
+            type(float)
+            Relative accuracy of the losses, between 0 and 1
+        max_buckets:
+            type(int)
+            Maximum number of buckets kept. With the default accuracy, 2048 buckets cover
+            losses over more than 17 orders of magnitude
+
+        Returns
+        -------
+        """
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        if max_buckets < 2:
+            raise ValueError("max_buckets must be at least 2")
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+        self._positive = {}
+        self._negative = {}
+        self._zeros = 0
+        self._min = np.inf
+        self._max = -np.inf
+
+    @property
+    def count(self):
+        """ Number of period losses in the sketch """
+        return self._zeros + sum(self._positive.values()) + sum(self._negative.values())
+
+    def update(self, period_losses):
+        """ Adds period losses to the sketch
+
+        Parameters
+        ----------
+        period_losses:
+            type(array-like)
+            The complete loss of each period, e.g. a chunk of a dense annual loss vector
+            or the values of PLT.period_sums()
+
+        Returns
+        -------
+        """
+        period_losses = np.ravel(np.asarray(period_losses, dtype=np.float64))
+        period_losses = period_losses[~np.isnan(period_losses)]
+        if len(period_losses) == 0:
+            return
+        self._min = min(self._min, period_losses.min())
+        self._max = max(self._max, period_losses.max())
+        self._zeros += int(np.count_nonzero(period_losses == 0))
+        for store, values in ((self._positive, period_losses[period_losses > 0]),
+                              (self._negative, -period_losses[period_losses < 0])):
+            keys, counts = np.unique(
+                np.ceil(np.log(values) / self._log_gamma).astype(np.int64), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                store[key] = store.get(key, 0) + count
+        self._collapse()
+
+    def merge(self, other):
+        """ Merges another sketch into this sketch
+
+        Parameters
+        ----------
+        other:
+            type(EPSketch)
+            A sketch with the same relative accuracy
+
+        Returns
+        -------
+        """
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Sketches with different relative accuracies cannot be merged")
+        for store, other_store in ((self._positive, other._positive),
+                                   (self._negative, other._negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self._zeros += other._zeros
+        self._min = min(self._min, other._min)
+        self._max = max(self._max, other._max)
+        self._collapse()
+
+    def to_ep_curve(self, ep_type, number_of_simulations: int = None):
+        """ Builds the approximate EP curve of the sketched period losses
+
+        Parameters
+        ----------
+        ep_type:
+            type(EPType)
+            EPType of the period losses (OEP for max occurrence, AEP for annual)
+        number_of_simulations:
+            type(int)
+            Number of simulation periods. Periods that were not added to the sketch count
+            as zero losses. Defaults to the number of period losses in the sketch
+
+        Returns
+        -------
+        EPCurve :
+            The curve where the i-th largest loss has probability i / n, as
+            plt_calculator.calculate_ep_curve, within the relative accuracy. It has at
+            most two points per bucket, so take TCEs from tce_losses_at_return_periods
+        """
+        losses, first_ranks, last_ranks = self._buckets(number_of_simulations)
+        # the first and last rank of each bucket, so flat runs of equal losses are kept
+        several = last_ranks > first_ranks
+        total = last_ranks[-1] if len(last_ranks) else 1
+        probabilities = np.concatenate((first_ranks, last_ranks[several])) / total
+        losses = np.concatenate((losses, losses[several]))
+        return ep_curve.EPCurve({'Probability': probabilities, 'Loss': losses},
+                                ep_type=ep_type)
+
+    def tce_losses_at_return_periods(self, return_periods, number_of_simulations: int = None):
+        """ Calculates the TCEs of the sketched period losses at many return periods.
+        The TCE methodology of EPCurve averages over one curve point per period, which the
+        compact curve of to_ep_curve does not have, so the tail sums are taken from the
+        bucket ranks instead. The TCEs are within the relative accuracy of those of the
+        exact curve.
+
+        Parameters
+        ----------
+        return_periods:
+            type(array-like)
+            Positive return periods
+        number_of_simulations:
+            type(int)
+            Number of simulation periods, as for to_ep_curve
+
+        Returns
+        -------
+        type(numpy.ndarray) Tail conditional expected losses in the order of return_periods
+        """
+        return_periods = np.asarray(return_periods, dtype=np.float64)
+        if not np.all(return_periods > 0):
+            raise ValueError("return_periods must be positive")
+        probabilities = 1 / return_periods
+        return_period_losses = self.to_ep_curve(
+            ep_curve.EPType.UNKNOWN, number_of_simulations).losses_at_probabilities(
+                probabilities)
+        losses, first_ranks, last_ranks = self._buckets(number_of_simulations)
+        if len(losses) == 0:
+            return return_period_losses
+        total = last_ranks[-1]
+        # the number of ranks k with k / total <= probability
+        tail_ranks = np.floor(probabilities * total).astype(np.int64)
+        tail_ranks += (tail_ranks + 1) / total <= probabilities
+        tail_ranks -= (tail_ranks > 0) & (tail_ranks / total > probabilities)
+        tail_ranks = np.minimum(tail_ranks, total)
+        # sums of k / total * loss over the ranks of each bucket, and the part of a bucket
+        bucket_sums = np.cumsum(
+            losses * (first_ranks + last_ranks) * (last_ranks - first_ranks + 1) / 2 / total)
+        bucket = np.minimum(np.searchsorted(last_ranks, tail_ranks), len(losses) - 1)
+        before = np.where(bucket > 0, bucket_sums[bucket - 1], 0.0)
+        partial_ranks = np.clip(tail_ranks - first_ranks[bucket] + 1, 0, None)
+        tail_sums = before + losses[bucket] * \
+            (first_ranks[bucket] + tail_ranks) * partial_ranks / 2 / total
+        # the point at the smallest probability and the return period point, as EPCurve
+        tail_sums = tail_sums + np.finfo(float).tiny * losses[0]
+        tail_points = tail_ranks + 1
+        on_curve = (tail_ranks > 0) & (tail_ranks / total == probabilities)
+        tail_sums = tail_sums + np.where(
+            on_curve, 0.0, probabilities * return_period_losses)
+        tail_points = tail_points + ~on_curve
+        return return_period_losses + tail_sums / tail_points
+
+    def _buckets(self, number_of_simulations):
+        """ Losses of the occupied buckets from the largest down, with their first and last
+        ranks """
+        zeros = self._zeros
+        if number_of_simulations is not None:
+            if number_of_simulations < self.count:
+                raise ValueError(
+                    "number_of_simulations is less than the number of period losses")
+            zeros += number_of_simulations - self.count
+        positive_keys = np.array(sorted(self._positive, reverse=True), dtype=np.int64)
+        negative_keys = np.array(sorted(self._negative), dtype=np.int64)
+        losses = np.concatenate((self._bucket_losses(positive_keys), [0.0],
+                                 -self._bucket_losses(negative_keys)))
+        if self.count:
+            # no bucket loss beyond the exact extremes, keeping the zero losses as they are
+            nonzero = losses != 0
+            losses[nonzero] = np.clip(losses[nonzero], self._min, self._max)
+        counts = np.concatenate(([self._positive[key] for key in positive_keys.tolist()],
+                                 [zeros],
+                                 [self._negative[key] for key in negative_keys.tolist()]))
+        occupied = counts > 0
+        losses, counts = losses[occupied], counts[occupied].astype(np.int64)
+        last_ranks = np.cumsum(counts)
+        return losses, last_ranks - counts + 1, last_ranks
+
+    def _bucket_losses(self, keys):
+        # the value within relative_accuracy of every loss in (gamma^(k-1), gamma^k]
+        return 2 * np.exp(keys * self._log_gamma) / (self._gamma + 1)
+
+    def _collapse(self):
+        excess = len(self._positive) + len(self._negative) - self.max_buckets
+        if excess <= 0:
+            return
+        # the lowest losses are the largest negative losses, then the smallest positive
+        for store, lowest_first in ((self._negative, True), (self._positive, False)):
+            collapsed = min(excess, len(store) - 1)
+            if collapsed > 0:
+                keys = sorted(store, reverse=lowest_first)[:collapsed + 1]
+                store[keys[-1]] += sum(store.pop(key) for key in keys[:-1])
+                excess -= collapsed
@@ -0,0 +1,209 @@
+""" PLT Storage
+Columnar readers and writers for PLTs. Parquet and Arrow IPC (Feather) need the optional
+pyarrow dependency. The memory-mapped format is a directory holding one fixed width .npy
+file per column, the period offsets index and a plt.json metadata file.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from plttools.plt import PLT, MISSING_DATE, _encode_segment
+
+FORMATS = ["parquet", "feather"]
+MMAP_VERSION = 1
+MMAP_METADATA = "plt.json"
+MMAP_OFFSETS = "offsets.npy"
+MMAP_CATEGORIES = ".categories.npy"
+
+
+def read_arrow(path, file_format="parquet", columns=None, periods=None,
+               number_of_simulations=None):
+    """ This function reads a PLT from a parquet or feather (Arrow IPC) file or directory
+    Parameters
+    ----------
+    path : file or directory path
+    file_format : "parquet" or "feather"
+    columns :
+        Optional columns to read as well as the PLT.REQUIRED_COLUMNS, e.g. ["Peril"].
+        All columns are read if None
+    periods :
+        Optional inclusive (first, last) range of PeriodIds to read. The filter is pushed
+        down so row groups outside the range are skipped
+    number_of_simulations :
+        Number of simulation periods. Will default to the max period of the PLT if None
+
+    Returns
+    -------
+    PLT :
+        The PLT, loaded column-wise into NumPy arrays
+
+    """
+    pyarrow, dataset = _import_pyarrow()
+    if file_format not in FORMATS:
+        raise ValueError("file_format must be one of {0}".format(', '.join(FORMATS)))
+    source = dataset.dataset(
+        path, format="ipc" if file_format == "feather" else file_format)
+    if columns is not None:
+        columns = PLT.REQUIRED_COLUMNS + \
+            [column for column in columns if column not in PLT.REQUIRED_COLUMNS]
+    row_filter = None
+    if periods is not None:
+        first_period, last_period = periods
+        row_filter = (dataset.field("PeriodId") >= first_period) & \
+            (dataset.field("PeriodId") <= last_period)
+    table = source.to_table(columns=columns, filter=row_filter)
+    if not all(column in table.column_names for column in PLT.REQUIRED_COLUMNS):
+        raise ValueError(
+            "{0} fields not in data. Check the spelling".format(
+                ', '.join(PLT.REQUIRED_COLUMNS)))
+    data = {name: _column_to_numpy(pyarrow, table.column(name))
+            for name in table.column_names}
+    return PLT(data, number_of_simulations)
+
+
+def write_arrow(plt, path, file_format="parquet", **kwargs):
+    """ This function writes a PLT to a parquet or feather (Arrow IPC) file
+    Dates are written as date32 (days since the epoch) so they are read back without parsing,
+    and segment columns as dictionary arrays of their codes and categories.
+    Parameters
+    ----------
+    plt : PLT
+    path : file path
+    file_format : "parquet" or "feather"
+    kwargs :
+        Passed through to pyarrow.parquet.write_table or pyarrow.feather.write_feather,
+        e.g. row_group_size or compression
+
+    Returns
+    -------
+
+    """
+    pyarrow, _ = _import_pyarrow()
+    if file_format not in FORMATS:
+        raise ValueError("file_format must be one of {0}".format(', '.join(FORMATS)))
+    arrays = {}
+    for name, values in plt.columns().items():
+        if name in PLT.DATE_COLUMNS:
+            arrays[name] = pyarrow.array(values, type=pyarrow.int32(),
+                                         mask=values == MISSING_DATE).cast(pyarrow.date32())
+        elif name in PLT.SEGMENT_COLUMNS:
+            arrays[name] = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(values, mask=values < 0), pyarrow.array(plt.categories(name)))
+        else:
+            arrays[name] = pyarrow.array(values)
+    table = pyarrow.table(arrays)
+    if file_format == "feather":
+        from pyarrow import feather  # pylint: disable=import-outside-toplevel
+        feather.write_feather(table, path, **kwargs)
+    else:
+        from pyarrow import parquet  # pylint: disable=import-outside-toplevel
+        parquet.write_table(table, path, **kwargs)
+
+
+def write_mmap(plt, path):
+    """ This function writes a PLT to a directory that can be opened memory-mapped
+    Parameters
+    ----------
+    plt : PLT
+    path : directory path, created if it does not exist
+
+    Returns
+    -------
+
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = plt.columns()
+    segments = [name for name in columns if name in PLT.SEGMENT_COLUMNS]
+    for name, values in columns.items():
+        if values.dtype == object:
+            # fixed width strings so the column can be memory-mapped
+            values = values.astype(str)
+        np.save(os.path.join(path, name + ".npy"), values, allow_pickle=False)
+    for name in segments:
+        np.save(os.path.join(path, name + MMAP_CATEGORIES),
+                plt.categories(name).astype(str), allow_pickle=False)
+    np.save(os.path.join(path, MMAP_OFFSETS), plt.period_offsets, allow_pickle=False)
+    metadata = {"version": MMAP_VERSION,
+                "simulations": int(plt.simulations),
+                "columns": list(columns),
+                "segments": segments}
+    with open(os.path.join(path, MMAP_METADATA), "w") as metadata_file:
+        json.dump(metadata, metadata_file)
+
+
+def open_mmap(path, columns=None, periods=None):
+    """ This function opens a PLT written by write_mmap with its columns memory-mapped
+    Nothing is read up front apart from the period offsets; pages of the requested columns
+    and periods are read by the operating system as they are used and can be shared between
+    processes through the page cache.
+    Parameters
+    ----------
+    path : directory path
+    columns :
+        Optional columns to open as well as the PLT.REQUIRED_COLUMNS. All if None
+    periods :
+        Optional inclusive (first, last) range of PeriodIds to open
+
+    Returns
+    -------
+    PLT :
+        A read-only PLT over the memory-mapped columns
+
+    """
+    with open(os.path.join(path, MMAP_METADATA)) as metadata_file:
+        metadata = json.load(metadata_file)
+    if metadata["version"] != MMAP_VERSION:
+        raise ValueError("Unsupported PLT store version {0}".format(metadata["version"]))
+    names = metadata["columns"]
+    if columns is not None:
+        names = [name for name in names
+                 if name in PLT.REQUIRED_COLUMNS or name in columns]
+    offsets = np.load(os.path.join(path, MMAP_OFFSETS))
+    rows = slice(0, offsets[-1])
+    if periods is not None:
+        first_period, last_period = periods
+        first_period = min(max(first_period, 0), len(offsets) - 1)
+        last_period = min(max(last_period, first_period - 1), len(offsets) - 2)
+        rows = slice(offsets[first_period], offsets[last_period + 1])
+        offsets = np.clip(offsets[:last_period + 2] - offsets[first_period], 0, None)
+    data = {name: np.asarray(np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))[rows]
+            for name in names}
+    categories = {}
+    for name in names:
+        if name in metadata.get("segments", []):
+            categories[name] = np.load(os.path.join(path, name + MMAP_CATEGORIES)).astype(object)
+        elif name in PLT.SEGMENT_COLUMNS:
+            # written as strings before segment columns were encoded
+            data[name], categories[name] = _encode_segment(data[name])
+    return PLT._from_columns(  # pylint: disable=protected-access
+        data, metadata["simulations"], offsets, categories)
+
+
+def _column_to_numpy(pyarrow, column):
+    if pyarrow.types.is_date32(column.type):
+        days = column.cast(pyarrow.int32()).fill_null(MISSING_DATE)
+        return days.to_numpy()
+    if pyarrow.types.is_dictionary(column.type):
+        # a categorical, so segment columns are encoded without comparing strings. Built
+        # from the indices and dictionary, as pyarrow only converts to pandas 1.0 or above
+        column = column.unify_dictionaries()
+        if column.num_chunks == 0:
+            return np.empty(0, dtype=object)
+        codes = np.concatenate([chunk.indices.fill_null(-1).to_numpy().astype(np.int64)
+                                for chunk in column.chunks])
+        dictionary = column.chunk(0).dictionary.to_numpy(zero_copy_only=False)
+        return pd.Categorical.from_codes(codes, dictionary)
+    # dates in any other type are converted to days by the PLT
+    return np.asarray(column.to_numpy())
+
+
+def _import_pyarrow():
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        from pyarrow import dataset
+    except ImportError as error:
+        raise ImportError(
+            "pyarrow is required to read and write parquet and feather PLTs") from error
+    return pyarrow, dataset
@@ -0,0 +1,356 @@
+""" Streaming
+Bounded memory aggregation of PLTs that are too large to load, read chunk by chunk.
+"""
+
+import numpy as np
+import pandas as pd
+from plttools import ep_curve, plt_calculator
+from plttools.plt_calculator import _empty_as_zero, _period_maxima
+
+STREAMED_COLUMNS = {"PeriodId": np.int64, "Loss": np.float64}
+
+
+class PeriodAggregator:
+    """ Period Aggregator
+    Folds chunks of period losses into dense annual and max occurrence loss vectors over
+    the simulation periods, so the period level metrics need memory proportional to the
+    number of simulations rather than the number of rows.
+    """
+
+    def __init__(self, number_of_simulations: int):
+        """ Type initialiser for Period Aggregator
+
+        Parameters
+        ----------
+        number_of_simulations:
+            type(int)
+            Number of simulation periods. Losses outside periods 1..number_of_simulations
+            are ignored
+
+        Returns
+        -------
+        """
+        self.simulations = number_of_simulations
+        self._annual_losses = np.zeros(number_of_simulations, dtype=np.float64)
+        self._max_losses = np.full(number_of_simulations, -np.inf)
+
+    def update(self, period_ids, losses):
+        """ Folds a chunk of losses into the period aggregates
+
+        Parameters
+        ----------
+        period_ids:
+            type(array-like)
+            PeriodIds of the chunk, in any order
+        losses:
+            type(array-like)
+            Losses of the chunk, aligned with period_ids
+
+        Returns
+        -------
+        """
+        self._annual_losses += plt_calculator.dense_annual_losses(
+            period_ids, losses, self.simulations)
+        np.maximum(self._max_losses, _period_maxima(period_ids, losses, self.simulations),
+                   out=self._max_losses)
+
+    @property
+    def annual_losses(self):
+        """ Dense vector of the total loss in each simulation period """
+        return self._annual_losses.copy()
+
+    @property
+    def max_occurrence_losses(self):
+        """ Dense vector of the largest single loss in each simulation period """
+        return _empty_as_zero(self._max_losses)
+
+    def get_aal(self):
+        """ Retrieves the AAL of the aggregated losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The average annual loss = total annual losses / number of simulations
+        """
+        return self._annual_losses.sum() / self.simulations
+
+    def get_standard_deviation(self):
+        """ Retrieves the standard deviation of the annual losses over every simulation period
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The standard deviation of the annual losses
+        """
+        return pd.Series(self._annual_losses).std()
+
+    def calculate_oep_curve(self):
+        """ Calculates the OEP curve of the aggregated losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        EPCurve
+        """
+        return plt_calculator.calculate_ep_curve(
+            self.max_occurrence_losses, ep_curve.EPType.OEP)
+
+    def calculate_aep_curve(self):
+        """ Calculates the AEP curve of the aggregated losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        EPCurve
+        """
+        return plt_calculator.calculate_ep_curve(
+            self._annual_losses, ep_curve.EPType.AEP)
+
+
+class StreamingMoments:
+    """ Streaming Moments
+    Accumulates the moments of the annual losses from period sorted chunks of losses in
+    constant memory, without the dense vectors of a PeriodAggregator. A period may continue
+    from one chunk into the next; its loss is carried until a later period starts. Completed
+    periods are merged into the running count, mean and central moment sums with the
+    pairwise update of Chan et al. and Pebay, which is Welford's update for a single period.
+    """
+
+    def __init__(self, number_of_simulations: int = None):
+        """ Type initialiser for Streaming Moments
+
+        Parameters
+        ----------
+        number_of_simulations:
+            type(int)
+            Number of simulation periods. Periods without losses count as zero annual
+            losses, and losses outside periods 1..number_of_simulations are ignored.
+            If None, the moments are over the periods with losses only
+
+        Returns
+        -------
+        """
+        self.simulations = number_of_simulations
+        self._moments = (0, 0.0, 0.0, 0.0, 0.0)
+        self._period = None
+        self._period_loss = 0.0
+
+    def update(self, period_ids, losses):
+        """ Folds a chunk of losses into the moments
+
+        Parameters
+        ----------
+        period_ids:
+            type(array-like)
+            PeriodIds of the chunk, sorted within and across chunks
+        losses:
+            type(array-like)
+            Losses of the chunk, aligned with period_ids
+
+        Returns
+        -------
+        """
+        period_ids = np.atleast_1d(np.asarray(period_ids, dtype=np.int64))
+        losses = np.atleast_1d(np.asarray(losses, dtype=np.float64))
+        if self.simulations is not None:
+            in_range = (period_ids >= 1) & (period_ids <= self.simulations)
+            if not in_range.all():
+                period_ids, losses = period_ids[in_range], losses[in_range]
+        if len(period_ids) == 0:
+            return
+        if np.any(period_ids[1:] < period_ids[:-1]) or \
+                (self._period is not None and period_ids[0] < self._period):
+            raise ValueError("PeriodIds must be sorted within and across chunks")
+        starts = np.flatnonzero(np.diff(period_ids, prepend=period_ids[0] - 1))
+        period_losses = np.add.reduceat(losses, starts)
+        if self._period is not None:
+            if period_ids[0] == self._period:
+                period_losses[0] += self._period_loss
+            else:
+                period_losses = np.concatenate(([self._period_loss], period_losses))
+        self._moments = _merge_moments(self._moments, _moments(period_losses[:-1]))
+        self._period = period_ids[-1]
+        self._period_loss = period_losses[-1]
+
+    @property
+    def periods(self):
+        """ Number of periods the moments are over, including empty simulation periods """
+        return self._final_moments()[0]
+
+    def get_aal(self):
+        """ Retrieves the AAL of the streamed losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The average annual loss = total annual losses / number of periods
+        """
+        count, mean = self._final_moments()[:2]
+        return mean if count else np.nan
+
+    def get_variance(self):
+        """ Retrieves the sample variance (ddof=1) of the annual losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The variance of the annual losses, nan for fewer than two periods
+        """
+        count, _, second = self._final_moments()[:3]
+        return second / (count - 1) if count > 1 else np.nan
+
+    def get_standard_deviation(self):
+        """ Retrieves the standard deviation of the annual losses, as pandas Series.std
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The standard deviation of the annual losses
+        """
+        return np.sqrt(self.get_variance())
+
+    def get_cv(self):
+        """ Retrieves the coefficient of variation of the annual losses
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The standard deviation / AAL
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.float64(self.get_standard_deviation()) / self.get_aal()
+
+    def get_skewness(self):
+        """ Retrieves the bias adjusted sample skewness of the annual losses,
+        as pandas Series.skew
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The skewness of the annual losses, nan for fewer than three periods
+        """
+        count, _, second, third, _ = self._final_moments()
+        if count < 3:
+            return np.nan
+        if second == 0:
+            return 0.0
+        skewness = np.sqrt(count) * third / second ** 1.5
+        return skewness * np.sqrt(count * (count - 1)) / (count - 2)
+
+    def get_kurtosis(self):
+        """ Retrieves the bias adjusted sample excess kurtosis of the annual losses,
+        as pandas Series.kurt
+
+        Parameters
+        ----------
+
+        Returns
+        -------
+        float :
+            The excess kurtosis of the annual losses, nan for fewer than four periods
+        """
+        count, _, second, _, fourth = self._final_moments()
+        if count < 4:
+            return np.nan
+        if second == 0:
+            return 0.0
+        kurtosis = count * fourth / second ** 2 - 3
+        return (count - 1) / ((count - 2) * (count - 3)) * ((count + 1) * kurtosis + 6)
+
+    def _final_moments(self):
+        moments = self._moments
+        if self._period is not None:
+            moments = _merge_moments(moments, _moments([self._period_loss]))
+        if self.simulations is not None and self.simulations > moments[0]:
+            # the periods without losses
+            moments = _merge_moments(
+                moments, (self.simulations - moments[0], 0.0, 0.0, 0.0, 0.0))
+        return moments
+
+
+def _moments(values):
+    """ Count, mean and sums of the second to fourth powers of the deviations """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return (0, 0.0, 0.0, 0.0, 0.0)
+    mean = values.mean()
+    deviations = values - mean
+    squares = deviations * deviations
+    return (len(values), mean, squares.sum(), (squares * deviations).sum(),
+            (squares * squares).sum())
+
+
+def _merge_moments(first, second):
+    """ Moments of the union of two sets from the moments of each """
+    count_a, mean_a, second_a, third_a, fourth_a = first
+    count_b, mean_b, second_b, third_b, fourth_b = second
+    if count_b == 0:
+        return first
+    if count_a == 0:
+        return second
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    delta_n = delta / count
+    mean = mean_a + delta_n * count_b
+    cross = delta * delta_n * count_a * count_b
+    second_sum = second_a + second_b + cross
+    third_sum = third_a + third_b + cross * delta_n * (count_a - count_b) + \
+        3 * delta_n * (count_a * second_b - count_b * second_a)
+    fourth_sum = fourth_a + fourth_b + \
+        cross * delta_n ** 2 * (count_a ** 2 - count_a * count_b + count_b ** 2) + \
+        6 * delta_n ** 2 * (count_a ** 2 * second_b + count_b ** 2 * second_a) + \
+        4 * delta_n * (count_a * third_b - count_b * third_a)
+    return (count, mean, second_sum, third_sum, fourth_sum)
+
+
+def read_csv_period_losses(path, number_of_simulations, chunksize=1000000, **kwargs):
+    """ This function streams a PLT CSV file into period aggregates in fixed size chunks
+    Only the PeriodId and Loss columns, which are all the AAL, standard deviation, OEP and
+    AEP need, are parsed, with explicit dtypes.
+    Parameters
+    ----------
+    path : CSV file path or buffer
+    number_of_simulations :
+        Number of simulation periods
+    chunksize :
+        Number of rows parsed at a time, which bounds the memory used while reading
+    kwargs :
+        Passed through to pandas.read_csv, e.g. sep or compression
+
+    Returns
+    -------
+    PeriodAggregator :
+        The annual and max occurrence losses of every simulation period
+
+    """
+    aggregator = PeriodAggregator(number_of_simulations)
+    chunks = pd.read_csv(path, usecols=list(STREAMED_COLUMNS), dtype=STREAMED_COLUMNS,
+                         chunksize=chunksize, **kwargs)
+    for chunk in chunks:
+        aggregator.update(chunk["PeriodId"].to_numpy(), chunk["Loss"].to_numpy())
+    return aggregator
@@ -15,5 +15,6 @@ setup(
     author="Anish Patel",
     license="MIT",
     packages=["plttools"],
-    install_requires=["pandas"]
+    install_requires=["pandas", "numpy"],
+    extras_require={"parquet": ["pyarrow"]}
 )
@@ -1,5 +1,6 @@
 """ EP Curve tests"""
 # pylint: disable=too-many-lines
+import numpy as np
 import pandas as pd
 import pytest
 from plttools import EPCurve, EPType
@@ -69,6 +70,70 @@ def test_get_standard_return_period_ep():
             assert standard_curve[probability] == test_ep_data.loc[
                 test_ep_data['Probability'] == probability, 'Loss'].values[0]
 
+def test_loss_lookups_do_not_change_curve():
+    """ Test that looking up losses leaves the curve unchanged """
+    oep_curve = EPCurve(DATA, ep_type=EPType.OEP)
+    probabilities = oep_curve.probabilities.copy()
+    oep_curve.loss_at_a_given_return_period(800)
+    oep_curve.tce_loss_at_a_given_return_period(333)
+    oep_curve.get_standard_return_period_ep()
+    assert (oep_curve.probabilities == probabilities).all()
+    assert len(oep_curve.curve) == len(DATA) + 1
+    assert oep_curve.loss_at_a_given_return_period(800) == 9987.5
+
+
+def test_curve_is_sorted_by_probability():
+    """ Test the curve is held sorted by probability with the max loss at the smallest """
+    oep_curve = EPCurve(list(reversed(DATA)), ep_type=EPType.OEP)
+    assert (oep_curve.curve.index == sorted(oep_curve.curve.index)).all()
+    assert oep_curve.losses[0] == max(row["Loss"] for row in DATA)
+    with pytest.raises(ValueError):
+        oep_curve.losses[0] = 0
+
+def test_losses_at_return_periods():
+    """ Test vectorized losses match single return period lookups """
+    oep_curve = EPCurve(DATA, ep_type=EPType.OEP)
+    return_periods = np.array([10, 100, 800, 1000, 1000000, 1.5])
+    losses = oep_curve.losses_at_return_periods(return_periods)
+    for return_period, loss in zip(return_periods, losses):
+        assert loss == oep_curve.loss_at_a_given_return_period(return_period)
+    assert list(oep_curve.losses_at_probabilities(1 / return_periods)) == list(losses)
+
+
+def test_losses_at_return_periods_non_positive_throws_value_error():
+    """ Test that non positive return periods throw a value error listing them """
+    oep_curve = EPCurve(DATA, ep_type=EPType.OEP)
+    with pytest.raises(ValueError, match='-1.0, 0.0'):
+        oep_curve.losses_at_return_periods([10, -1, 0])
+    with pytest.raises(ValueError):
+        oep_curve.losses_at_probabilities([np.nan])
+
+def test_tce_losses_at_return_periods_match_tail_mean():
+    """ Regression test of vectorized TCE against the boolean mask tail mean methodology """
+    oep_curve = EPCurve(DATA, ep_type=EPType.OEP)
+    return_periods = [1, 1.3, 2, 10, 33.3, 100, 250, 800, 1000, 1000000]
+    tce_losses = oep_curve.tce_losses_at_return_periods(return_periods)
+    for return_period, tce_loss in zip(return_periods, tce_losses):
+        assert tce_loss == pytest.approx(_tail_mean_tce(DATA, return_period), rel=1e-12)
+        assert tce_loss == oep_curve.tce_loss_at_a_given_return_period(return_period)
+    with pytest.raises(ValueError):
+        oep_curve.tce_losses_at_return_periods([100, 0])
+
+
+def _tail_mean_tce(data, return_period):
+    """ TCE as originally calculated: the curve is interpolated at the return period and the
+    mean of probability * loss is taken over the curve points at or below its probability """
+    curve = pd.DataFrame(data)
+    curve = pd.concat([curve, pd.DataFrame([{"Probability": np.finfo(float).tiny,
+                                             "Loss": curve.Loss.max()}])]).set_index('Probability')
+    probability = 1 / return_period
+    if probability not in curve.index:
+        curve = curve.reindex(curve.index.union([probability])).sort_index(
+            ascending=True).interpolate(method='index')
+    return_period_loss = curve.loc[probability].Loss
+    subset = curve[curve.index <= probability]
+    return return_period_loss + (subset.index.to_numpy(dtype=float) * subset['Loss']).mean()
+
 DATA = [
     {
         "Probability": 0.001,
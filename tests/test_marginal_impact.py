@@ -1,4 +1,4 @@
-from plttools import MarginalImpact, PLT
+from plttools import MarginalImpact, PLT, plt_calculator
 
 
 def test_marginal_impact():
@@ -21,3 +21,73 @@ def test_marginal_impact():
     assert abs(1170 - 1287) / 1170 == marginal.change_in_aal()
 
     marginal_aep = marginal.base_aep()
+
+
+def test_marginal_impact_matches_grouped_plt():
+    d_1 = {
+        "PeriodId": [1, 1, 2, 3, 4, 5, 6],
+        "EventId": [123, 678, 124, 125, 126, 127, 128],
+        "EventDate": [1, 2, 1, 1, 1, 1, 1],
+        "Loss": [1000, 1020, 900, 1100, 1200, 800, 1000],
+        "LossDate": [1, 2, 1, 1, 1, 1, 1]
+    }
+    d_2 = {
+        "PeriodId": [1, 2, 2, 8],
+        "EventId": [123, 124, 999, 130],
+        "EventDate": [1, 1, 3, 1],
+        "Loss": [100, 90, 500, 700],
+        "LossDate": [1, 1, 3, 1]
+    }
+    number_of_simulations = 8
+    marginal = MarginalImpact(PLT(d_1, 8), PLT(d_2, 8), number_of_simulations)
+    assert marginal._grouped_plt is None
+    assert marginal.submission_aal() == 1390 / 8
+    assert marginal.grouped_aal() == marginal.grouped_plt.get_aal()
+    grouped_aep = plt_calculator.calculate_aep_curve(marginal.grouped_plt, number_of_simulations)
+    assert list(marginal.grouped_aep().losses) == list(grouped_aep.losses)
+    assert marginal.grouped_aep() is marginal.grouped_aep()
+
+
+def test_marginal_impact_aals_over_the_same_periods():
+    base = {"PeriodId": [1, 2, 12], "EventId": [1, 2, 3], "EventDate": [1, 1, 1],
+            "Loss": [100, 200, 700], "LossDate": [1, 1, 1]}
+    empty = {"PeriodId": [1], "EventId": [9], "EventDate": [1], "Loss": [0], "LossDate": [1]}
+    for base_plt in (PLT(base, 5), PLT(base, 12)):
+        marginal = MarginalImpact(base_plt, PLT(empty, 10), 10)
+        assert marginal.base_aal() == 300 / 10
+        assert marginal.submission_aal() == 0
+        assert marginal.change_in_aal() == 0
+
+
+def test_screen_matches_marginal_impact():
+    base = {
+        "PeriodId": [1, 1, 2, 3, 4, 5, 6, 7, 8],
+        "EventId": [123, 678, 124, 125, 126, 127, 128, 129, 130],
+        "EventDate": [1, 2, 1, 1, 1, 1, 1, 1, 1],
+        "Loss": [1000, 1020, 900, 1100, 1200, 800, 1000, 300, 50],
+        "LossDate": [1, 2, 1, 1, 1, 1, 1, 1, 1]
+    }
+    submissions = {
+        "small": PLT({"PeriodId": [1, 2], "EventId": [123, 124], "EventDate": [1, 1],
+                      "Loss": [100, 90], "LossDate": [1, 1]}, 8),
+        "large": PLT({"PeriodId": [1, 3, 8], "EventId": [678, 999, 130], "EventDate": [2, 4, 1],
+                      "Loss": [2000, 500, 700], "LossDate": [2, 4, 1]}, 8),
+    }
+    return_periods = [1.5, 2, 4, 8]
+    screened = MarginalImpact.screen(PLT(base, 8), submissions, 8, return_periods)
+    assert list(screened.index) == ["large", "small"]
+    for name, submission in submissions.items():
+        marginal = MarginalImpact(PLT(base, 8), submission, 8)
+        assert screened.loc[name, "SubmissionAAL"] == submission.get_aal()
+        assert screened.loc[name, "ChangeInAAL"] == marginal.change_in_aal()
+        grouped_oep = plt_calculator.calculate_oep_curve(marginal.grouped_plt, 8)
+        base_oep = plt_calculator.calculate_oep_curve(PLT(base, 8), 8)
+        for return_period in return_periods:
+            base_loss = marginal.base_aep().loss_at_a_given_return_period(return_period)
+            grouped_loss = marginal.grouped_aep().loss_at_a_given_return_period(return_period)
+            assert screened.loc[name, "MarginalAEP_{0}".format(return_period)] == \
+                abs(base_loss - grouped_loss) / base_loss
+            base_loss = base_oep.loss_at_a_given_return_period(return_period)
+            grouped_loss = grouped_oep.loss_at_a_given_return_period(return_period)
+            assert screened.loc[name, "MarginalOEP_{0}".format(return_period)] == \
+                abs(base_loss - grouped_loss) / base_loss
@@ -1,4 +1,6 @@
 """ Tests PLT """
+import numpy as np
+import pandas as pd
 import pytest
 from plttools import PLT
 
@@ -9,6 +11,11 @@ def test_get_aal():
     assert my_plt.get_aal() == 900
 
 
+def test_get_aal_includes_periods_above_simulations():
+    """ Test the AAL keeps the losses of periods above the number of simulations """
+    assert PLT(DATA, 3).get_aal() == 1500
+
+
 def test_no_simulations_set_sets_to_max_period():
     """ Test that if no simulations are set, then the sim periods set to max period id"""
     my_plt = PLT(DATA)
@@ -34,6 +41,172 @@ def test_invalid_plt_columns_raises_value_error():
         PLT(bad_plt_data)
 
 
+def test_plt_columns_are_typed_arrays():
+    """ Test PLT columns are held as typed NumPy arrays """
+    my_plt = PLT(DATA, 5)
+    assert my_plt.period_ids.dtype == np.int32
+    assert my_plt.event_ids.dtype == np.int64
+    assert my_plt.losses.dtype == np.float64
+    assert my_plt.event_dates.dtype == np.int32
+    assert my_plt.loss_dates[0] == (np.datetime64('2016-03-13') - np.datetime64('1970-01-01')).astype(int)
+
+
+def test_plt_frame_is_cached_until_the_data_changes():
+    """ Test the plt DataFrame is built once and rebuilt when the data is replaced """
+    my_plt = PLT(DATA, 5)
+    view = my_plt.plt
+    assert my_plt.plt is view
+    assert list(view['Loss']) == list(my_plt.losses)
+    assert list(view['PeriodId']) == list(my_plt.period_ids)
+    assert view['EventDate'].iloc[0] == pd.Timestamp('2016-03-10')
+    my_plt.plt = pd.DataFrame(DATA[:2])
+    assert len(my_plt.plt) == 2
+
+
+def test_plt_from_columns_matches_plt_from_records():
+    """ Test a column-wise PLT matches one built from a list of records """
+    columns = pd.DataFrame(DATA).to_dict(orient='list')
+    from_columns = PLT(columns, 5)
+    from_arrays = PLT.from_arrays(columns['PeriodId'], columns['EventId'], columns['Loss'],
+                                  columns['EventDate'], columns['LossDate'], 5)
+    from_records = PLT(DATA, 5)
+    for my_plt in [from_columns, from_arrays]:
+        assert np.array_equal(my_plt.losses, from_records.losses)
+        assert np.array_equal(my_plt.loss_dates, from_records.loss_dates)
+
+
+def test_replacing_plt_data():
+    """ Test the PLT columns are read-only and data is replaced through the plt attribute """
+    my_plt = PLT(DATA, 5)
+    with pytest.raises(ValueError):
+        my_plt.losses[0] = 0
+    doubled = pd.DataFrame(DATA)
+    doubled['Loss'] = doubled['Loss'] * 2
+    my_plt.plt = doubled
+    assert my_plt.get_aal() == 1800
+
+
+def test_plt_is_sorted_and_indexed_by_period():
+    """ Test PLT rows are sorted by period and the period index selects each period """
+    my_plt = PLT(list(reversed(DATA)), 5)
+    assert np.all(np.diff(my_plt.period_ids) >= 0)
+    assert list(my_plt.period_offsets) == [0, 0, 1, 1, 3, 8, 9]
+    assert list(my_plt.losses[my_plt.period_slice(3)]) == [300, 200]
+    assert len(my_plt.losses[my_plt.period_slice(2)]) == 0
+    assert len(my_plt.losses[my_plt.period_slice(7)]) == 0
+
+
+def test_period_sums_and_maxima():
+    """ Test per period sums and maxima """
+    my_plt = PLT(DATA, 5)
+    periods, sums = my_plt.period_sums()
+    _, maxima = my_plt.period_maxima()
+    assert list(periods) == [1, 3, 4, 5]
+    assert list(sums) == [100, 500, 3000, 900]
+    assert list(maxima) == [100, 300, 800, 900]
+
+
+def test_dense_period_losses_are_cached():
+    """ Test annual and max occurrence vectors are dense, zero filled and cached """
+    my_plt = PLT(DATA, 6)
+    assert list(my_plt.annual_losses) == [100, 0, 500, 3000, 900, 0]
+    assert list(my_plt.max_occurrence_losses) == [100, 0, 300, 800, 900, 0]
+    assert my_plt.annual_losses is my_plt.annual_losses
+    assert list(my_plt.dense_period_losses(np.add, 3)) == [100, 0, 500]
+
+
+def test_dense_period_losses_invalidated_on_change():
+    """ Test cached period losses are rebuilt when the data or simulations change """
+    my_plt = PLT(DATA, 5)
+    assert my_plt.get_aal() == 900
+    my_plt.simulations = 10
+    assert len(my_plt.annual_losses) == 10
+    assert my_plt.get_aal() == 450
+    halved = pd.DataFrame(DATA)
+    halved['Loss'] = halved['Loss'] / 2
+    my_plt.plt = halved
+    assert my_plt.get_aal() == 225
+    assert my_plt.max_occurrence_losses.max() == 450
+
+
+def test_standard_deviation_includes_empty_periods():
+    """ Test the standard deviation is taken over every simulation period """
+    my_plt = PLT(DATA, 5)
+    assert my_plt.get_standard_deviation() == pytest.approx(np.std([100, 0, 500, 3000, 900], ddof=1))
+
+
+def test_dataframe_view_rejects_column_assignment():
+    """ Test columns cannot be assigned on the view, and a new frame replaces the data """
+    my_plt = PLT(DATA, 5)
+    with pytest.raises(TypeError):
+        my_plt.plt['Loss'] = 0
+    frame = my_plt.plt.copy()
+    frame['Loss'] *= 2
+    my_plt.plt = frame
+    assert my_plt.get_aal() == 1800
+
+
+def test_missing_dates_are_nat():
+    """ Test missing dates are kept as NaT in the DataFrame view and copies """
+    rows = [dict(row) for row in DATA]
+    rows[2]["LossDate"] = None
+    my_plt = PLT(rows, 5)
+    loss_dates = my_plt.plt["LossDate"]
+    assert loss_dates.isna().sum() == 1
+    assert PLT(my_plt, 5).plt["LossDate"].isna().sum() == 1
+
+
+def test_segment_columns_are_dictionary_encoded():
+    """ Test segment columns are stored as codes into sorted categories """
+    perils = ["WS", "EQ", "WS", "FL", None, "EQ"]
+    rows = [dict(row, Peril=peril) for row, peril in zip(DATA, perils)]
+    my_plt = PLT(rows, 5)
+    assert list(my_plt.categories("Peril")) == ["EQ", "FL", "WS"]
+    assert my_plt.columns()["Peril"].dtype == np.int32
+    expected = pd.Series(perils)[np.argsort([row["PeriodId"] for row in rows], kind="stable")]
+    assert list(my_plt.plt["Peril"].astype(object).fillna("-")) == \
+        list(expected.fillna("-"))
+    with pytest.raises(ValueError):
+        my_plt.categories("Country")
+
+
+def test_filter_matches_rebuilt_plt():
+    """ Test a filtered view has the metrics of a PLT of the same rows """
+    perils = ["WS", "EQ", "WS", "FL", "WS", "EQ"]
+    countries = ["US", "US", "GB", "US", "US", "US"]
+    rows = [dict(row, Peril=peril, Country=country)
+            for row, peril, country in zip(DATA, perils, countries)]
+    my_plt = PLT(rows, 5)
+    for criteria in ({"Peril": "WS"}, {"Peril": "WS", "Country": "US"},
+                     {"Peril": ["EQ", "FL"]}, {"Country": "US", "Peril": "EQ"},
+                     {"Peril": "HU"}):
+        view = my_plt.filter(**criteria)
+        selected = [row for row in rows if all(
+            row[name] in np.atleast_1d(values) for name, values in criteria.items())]
+        expected = PLT(selected, 5) if selected else None
+        assert len(view) == len(selected)
+        if expected is not None:
+            assert list(view.annual_losses) == list(expected.annual_losses)
+            assert list(view.max_occurrence_losses) == list(expected.max_occurrence_losses)
+            assert view.get_aal() == expected.get_aal()
+            assert list(view.plt["Peril"]) == list(expected.plt["Peril"])
+
+
+def test_filter_is_a_view():
+    """ Test a filtered PLT only gathers the columns it uses, and views compose """
+    rows = [dict(row, Peril=peril) for row, peril in zip(DATA, ["WS", "EQ"] * 3)]
+    my_plt = PLT(rows, 5)
+    view = my_plt.filter(Peril="WS")
+    assert view.get_aal() == my_plt.losses[view.rows].sum() / 5
+    assert list(view._data._gathered) == ["Loss"]  # pylint: disable=protected-access
+    assert list(view.column("LossDate")) == list(my_plt.column("LossDate")[view.rows])
+    assert list(view._data._gathered) == ["Loss", "LossDate"]  # pylint: disable=protected-access
+    assert view.filter(Peril="EQ").get_aal() == 0
+    assert list(view.filter(Peril="WS").rows) == list(view.rows)
+    with pytest.raises(AttributeError):
+        view.plt = rows
+
+
 DATA = [
     {
         "PeriodId": 1,
@@ -1,6 +1,8 @@
 """ PLT Calculator tests"""
 # pylint: disable=line-too-long
 
+import numpy as np
+import pytest
 import pandas as pd
 from plttools import plt_calculator, EPCurve, EPType
 from plttools.plt import PLT
@@ -30,6 +32,55 @@ def test_calculate_aep_curve():
     assert aep.loss_at_a_given_return_period(1) == 0
 
 
+def test_ep_curves_from_dataframe_match_plt():
+    """ Test EP curves scattered from a DataFrame match those from a PLT """
+    my_plt = PLT(DATA, 5)
+    for calculate in [plt_calculator.calculate_oep_curve, plt_calculator.calculate_aep_curve]:
+        from_frame = calculate(TEST_PLT, 5)
+        from_plt = calculate(my_plt, 5)
+        for return_period in [1, 1.25, 2, 5, 10]:
+            assert from_frame.loss_at_a_given_return_period(return_period) == \
+                from_plt.loss_at_a_given_return_period(return_period)
+
+
+def test_dense_period_losses():
+    """ Test dense scatter of period losses """
+    period_ids = np.array([3, 1, 3, 7, 0])
+    losses = np.array([-10.0, 5.0, -20.0, 100.0, 100.0])
+    assert list(plt_calculator.dense_annual_losses(period_ids, losses, 4)) == [5, 0, -30, 0]
+    assert list(plt_calculator.dense_max_occurrence_losses(period_ids, losses, 4)) == [5, 0, -10, 0]
+
+
+def test_summarize():
+    """ Test the PLT summary matches the individual metric calculations """
+    my_plt = PLT(DATA, 5)
+    summary = my_plt.summary()
+    oep = plt_calculator.calculate_oep_curve(my_plt, 5)
+    aep = plt_calculator.calculate_aep_curve(my_plt, 5)
+    assert summary.aal == my_plt.get_aal()
+    assert summary.standard_deviation == my_plt.get_standard_deviation()
+    assert summary.cv == my_plt.get_standard_deviation() / my_plt.get_aal()
+    assert summary.oep == oep.get_standard_return_period_ep()
+    assert summary.aep == aep.get_standard_return_period_ep()
+    assert summary.aep_tce[0.01] == aep.tce_loss_at_a_given_return_period(100)
+    assert summary.oep_tce[1] == oep.tce_loss_at_a_given_return_period(1)
+    assert plt_calculator.summarize(TEST_PLT, 5) == summary
+    assert plt_calculator.summarize(PLT(DATA, 3)).aal == PLT(DATA, 3).get_aal()
+    assert plt_calculator.summarize(TEST_PLT, 3).aal == PLT(DATA, 3).get_aal()
+    with pytest.raises(ValueError):
+        plt_calculator.summarize(TEST_PLT)
+
+
+def test_return_period_losses_match_ep_curves():
+    """ Test batch return period losses match the EP curve of each row """
+    period_losses = np.random.default_rng(0).pareto(1.5, (3, 50))
+    return_periods = [1, 1.7, 2, 10, 49, 50, 100]
+    losses = plt_calculator.return_period_losses(period_losses, return_periods)
+    for row, row_losses in zip(period_losses, losses):
+        curve = plt_calculator.calculate_ep_curve(row, EPType.AEP)
+        assert list(row_losses) == list(curve.losses_at_return_periods(return_periods))
+
+
 def test_group_plts():
     """Group PLTs"""
     d_1 = {
@@ -52,6 +103,88 @@ def test_group_plts():
     assert grouped_plt.loc[grouped_plt['PeriodId'] == 1].Loss.sum() == 404
 
 
+def test_group_many_plts():
+    """Group any number of PLTs, summing losses of the same occurrence"""
+    plts = [PLT(DATA, 5), PLT(DATA, 5), PLT(DATA[:3], 8)]
+    grouped_plt = plt_calculator.group_plts(*plts)
+    assert grouped_plt.simulations == 8
+    assert len(grouped_plt) == len(DATA)
+    assert list(grouped_plt.annual_losses) == [300, 0, 1500, 6000, 1800, 0, 0, 0]
+    assert grouped_plt.get_aal() == sum(plt.annual_losses.sum() for plt in plts) / 8
+    expected = pd.concat([plt.plt for plt in plts]).groupby(
+        ['PeriodId', 'EventId', 'EventDate', 'LossDate']).Loss.sum()
+    assert list(grouped_plt.losses) == list(expected.values)
+    assert len(plt_calculator.group_plts(PLT(DATA, 5))) == len(DATA)
+
+
+def test_calculate_curves_parallel():
+    """ Test curves calculated over a process pool match the serial curves in order """
+    plts = [PLT(DATA, 5), PLT(DATA[:4], 7), PLT(DATA[2:], 6), TEST_PLT]
+    curves = plt_calculator.calculate_curves_parallel(plts, workers=2)
+    curves_with_simulations = plt_calculator.calculate_curves_parallel(
+        plts, number_of_simulations=9, workers=2, chunksize=2)
+    assert len(curves) == len(plts)
+    for plt, (oep, aep), (oep_9, _) in zip(plts[:3], curves, curves_with_simulations):
+        assert oep.get_ep_type() == EPType.OEP
+        assert aep.get_ep_type() == EPType.AEP
+        serial_oep = plt_calculator.calculate_oep_curve(plt, plt.simulations)
+        serial_aep = plt_calculator.calculate_aep_curve(plt, plt.simulations)
+        assert list(oep.losses) == list(serial_oep.losses)
+        assert list(aep.losses) == list(serial_aep.losses)
+        assert list(oep_9.losses) == list(plt_calculator.calculate_oep_curve(plt, 9).losses)
+    assert not curves[0][0].losses.flags.writeable
+
+
+@pytest.mark.parametrize("workers", [2, 3, 8])
+def test_curves_with_workers_match_serial(workers):
+    """ Test aggregating period ranges on threads gives bit-identical curves """
+    rng = np.random.default_rng(7)
+    period_ids = rng.integers(1, 500, 20000)
+    losses = rng.lognormal(10, 2, 20000)
+    my_plt = PLT.from_arrays(period_ids, np.arange(20000), losses,
+                             np.zeros(20000, dtype=np.int32), np.zeros(20000, dtype=np.int32),
+                             number_of_simulations=600)
+    serial_plt = PLT(my_plt, 600)
+    frame = pd.DataFrame({"PeriodId": period_ids, "Loss": losses})
+    for calculate in (plt_calculator.calculate_oep_curve, plt_calculator.calculate_aep_curve):
+        serial = calculate(serial_plt, 600)
+        parallel = calculate(my_plt, 600, workers=workers)
+        assert np.array_equal(parallel.losses, serial.losses)
+        assert np.array_equal(parallel.probabilities, serial.probabilities)
+        with pytest.raises(ValueError):
+            calculate(frame, 600, workers=workers)
+    assert plt_calculator.summarize(my_plt, workers=workers) == \
+        plt_calculator.summarize(serial_plt)
+
+
+def test_metric_cube_matches_filtered_plts():
+    """ Test the metric cube matches the metrics of each filtered segment """
+    rng = np.random.default_rng(5)
+    rows = 3000
+    my_plt = PLT.from_arrays(rng.integers(1, 200, rows), np.arange(rows),
+                             rng.lognormal(10, 1, rows), np.zeros(rows, dtype=np.int32),
+                             np.zeros(rows, dtype=np.int32), number_of_simulations=250,
+                             Peril=rng.choice(["WS", "EQ", "FL"], rows),
+                             Country=rng.choice(["US", "GB"], rows))
+    cube = plt_calculator.metric_cube(my_plt, by=["Peril", "Country"], return_periods=[10, 100])
+    assert len(cube) == 6
+    assert list(cube.columns) == ["Peril", "Country", "AAL", "StandardDeviation", "CV",
+                                  "OEP_10", "OEP_100", "AEP_10", "AEP_100"]
+    for _, cell in cube.iterrows():
+        segment = my_plt.filter(Peril=cell["Peril"], Country=cell["Country"])
+        assert cell["AAL"] == pytest.approx(segment.get_aal())
+        assert cell["StandardDeviation"] == pytest.approx(segment.get_standard_deviation())
+        oep = plt_calculator.calculate_oep_curve(segment, 250)
+        aep = plt_calculator.calculate_aep_curve(segment, 250)
+        assert [cell["OEP_10"], cell["OEP_100"]] == pytest.approx(
+            list(oep.losses_at_return_periods([10, 100])))
+        assert [cell["AEP_10"], cell["AEP_100"]] == pytest.approx(
+            list(aep.losses_at_return_periods([10, 100])))
+    by_peril = plt_calculator.metric_cube(my_plt, by="Peril")
+    assert list(by_peril["Peril"]) == ["EQ", "FL", "WS"]
+    assert by_peril["AAL"].sum() == pytest.approx(my_plt.get_aal())
+
+
 DATA = [
     {
         "PeriodId": 1,
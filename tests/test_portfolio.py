@@ -0,0 +1,76 @@
+""" Portfolio tests"""
+import numpy as np
+import pytest
+from plttools import PLT, PortfolioAccumulator, plt_calculator
+from tests.test_plt import DATA
+
+
+def _contracts():
+    scaled = [dict(row, Loss=row["Loss"] * 0.3) for row in DATA]
+    other = [dict(row, PeriodId=row["PeriodId"] + 1, EventId=row["EventId"] + 1) for row in DATA]
+    return PLT(DATA, 6), PLT(scaled, 6), PLT(other, 6)
+
+
+def _assert_matches(portfolio, grouped_plt):
+    assert np.allclose(portfolio.annual_losses, grouped_plt.annual_losses)
+    assert np.allclose(portfolio.max_occurrence_losses, grouped_plt.max_occurrence_losses)
+    assert portfolio.get_aal() == pytest.approx(grouped_plt.get_aal())
+    assert portfolio.get_standard_deviation() == pytest.approx(grouped_plt.get_standard_deviation())
+    oep = plt_calculator.calculate_oep_curve(grouped_plt, 6)
+    aep = plt_calculator.calculate_aep_curve(grouped_plt, 6)
+    assert np.allclose(portfolio.calculate_oep_curve().losses, oep.losses)
+    assert np.allclose(portfolio.calculate_aep_curve().tce_losses_at_return_periods([2, 5]),
+                       aep.tce_losses_at_return_periods([2, 5]))
+
+
+def test_portfolio_add_and_remove_matches_grouped_plts():
+    """ Test the accumulated portfolio matches grouping its current PLTs """
+    first, second, third = _contracts()
+    portfolio = PortfolioAccumulator(6)
+    for plt in (first, second, third):
+        portfolio.add(plt)
+    _assert_matches(portfolio, plt_calculator.group_plts(first, second, third))
+    portfolio.remove(second)
+    _assert_matches(portfolio, plt_calculator.group_plts(first, third))
+
+
+def test_portfolio_remove_everything_is_exactly_empty():
+    """ Test removing every PLT leaves exact zeros """
+    first, second, _ = _contracts()
+    portfolio = PortfolioAccumulator(6)
+    portfolio.add(first)
+    portfolio.add(second)
+    portfolio.remove(first)
+    portfolio.remove(second)
+    assert not portfolio.annual_losses.any()
+    assert not portfolio.max_occurrence_losses.any()
+
+
+def test_portfolio_reuses_slots_of_removed_occurrences():
+    """ Test add and remove churn reuses the occurrence slots instead of growing them """
+    first, second, third = _contracts()
+    portfolio = PortfolioAccumulator(6)
+    portfolio.add(first)
+    capacity = len(portfolio._occurrence_losses)  # pylint: disable=protected-access
+    for _ in range(3):
+        portfolio.remove(first)
+        portfolio.add(third)
+        portfolio.remove(third)
+        portfolio.add(first)
+    assert len(portfolio._occurrence_losses) == capacity  # pylint: disable=protected-access
+    portfolio.add(second)
+    portfolio.remove(first)
+    portfolio.add(third)
+    _assert_matches(portfolio, plt_calculator.group_plts(second, third))
+
+
+def test_portfolio_remove_unknown_plt_raises_value_error():
+    """ Test removing a PLT that was not added raises a value error and changes nothing """
+    first, _, third = _contracts()
+    portfolio = PortfolioAccumulator(6)
+    portfolio.add(first)
+    with pytest.raises(ValueError):
+        portfolio.remove(third)
+    with pytest.raises(ValueError):
+        portfolio.remove(PLT(DATA + DATA, 6))
+    assert portfolio.get_aal() == first.get_aal()
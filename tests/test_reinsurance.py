@@ -0,0 +1,137 @@
+""" Reinsurance tests"""
+import numpy as np
+import pytest
+from plttools import PLT, plt_calculator, reinsurance
+from tests.test_plt import DATA
+
+
+def _plt():
+    # two periods, with dates out of row order in the first
+    return PLT.from_arrays([1, 1, 1, 2, 2], [1, 2, 3, 4, 5], [300, 100, 500, 50, 400],
+                           [3, 1, 2, 1, 2], [3, 1, 2, 1, 2], number_of_simulations=3)
+
+
+def test_apply_occurrence_layer():
+    """ Test occurrence terms limit each loss """
+    layered = reinsurance.apply_layer(_plt(), occ_retention=100, occ_limit=250)
+    assert list(layered.losses) == [200, 0, 250, 0, 250]
+    assert list(layered.event_ids) == [1, 2, 3, 4, 5]
+
+
+def test_apply_aggregate_layer_in_date_order():
+    """ Test aggregate terms are eroded by the losses in date order """
+    layered = reinsurance.apply_layer(_plt(), agg_retention=150, agg_limit=600)
+    # period 1 in date order: 100, 500 (450 to the layer), 300 (150 to exhaust the limit)
+    assert list(layered.losses) == [150, 0, 450, 0, 300]
+    assert list(layered.annual_losses) == [600, 300, 0]
+    by_event_date = reinsurance.apply_layer(
+        _plt(), agg_retention=150, agg_limit=600, date_column="EventDate")
+    assert list(by_event_date.losses) == list(layered.losses)
+    with pytest.raises(ValueError):
+        reinsurance.apply_layer(_plt(), agg_limit=-1)
+
+
+def test_aggregate_layer_restarts_each_period():
+    """ Test a large loss leaves no rounding in the running totals of later periods """
+    my_plt = PLT.from_arrays([1, 2, 2, 2], [1, 2, 3, 4], [3e15, 33.3, 33.3, 33.4],
+                             [1, 1, 2, 3], [1, 1, 2, 3], number_of_simulations=2)
+    layered = reinsurance.apply_layer(my_plt, agg_retention=100.0)
+    assert list(layered.annual_losses) == [3e15 - 100, 0]
+    reinstated = reinsurance.apply_reinstatements(my_plt, 0, 1e16, reinstatements=0,
+                                                  agg_retention=100.0)
+    assert reinstated.recoveries[1] == 0
+
+
+def test_layered_annual_losses_match_aggregate_terms():
+    """ Test the layered annual losses are the aggregate terms of the occurrence layer """
+    my_plt = PLT(DATA, 5)
+    layered = reinsurance.apply_layer(my_plt, 50, 400, 100, 500)
+    occurrence_layer = PLT.from_arrays(my_plt.period_ids, my_plt.event_ids,
+                                       np.clip(my_plt.losses - 50, 0, 400),
+                                       my_plt.event_dates, my_plt.loss_dates, 5)
+    assert layered.annual_losses == pytest.approx(
+        np.clip(occurrence_layer.annual_losses - 100, 0, 500))
+    aep = plt_calculator.calculate_aep_curve(layered, 5)
+    assert aep.loss_at_a_given_return_period(10000) == max(layered.annual_losses)
+
+
+def test_evaluate_layers_matches_apply_layer():
+    """ Test a ladder of layers evaluated together matches each layer applied alone """
+    rng = np.random.default_rng(17)
+    rows = 4000
+    my_plt = PLT.from_arrays(rng.integers(1, 300, rows), np.arange(rows),
+                             rng.lognormal(10, 1.5, rows), rng.integers(0, 365, rows),
+                             rng.integers(0, 365, rows), number_of_simulations=300)
+    layers = [{"OccRetention": 1e4, "OccLimit": 5e4},
+              {"OccRetention": 5e4, "OccLimit": 1e5, "AggLimit": 2e5},
+              {"OccRetention": 1e5, "AggRetention": 1e5, "AggLimit": 3e5},
+              {}]
+    evaluated = reinsurance.evaluate_layers(my_plt, layers, return_periods=[10, 100],
+                                            chunk_size=1000)
+    assert evaluated.index.name == "Layer"
+    for layer, terms in enumerate(layers):
+        layered = reinsurance.apply_layer(
+            my_plt, terms.get("OccRetention", 0), terms.get("OccLimit", np.inf),
+            terms.get("AggRetention", 0), terms.get("AggLimit", np.inf))
+        row = evaluated.loc[layer]
+        annual_losses = layered.annual_losses
+        assert row["ExpectedLoss"] == pytest.approx(layered.get_aal())
+        assert row["StandardDeviation"] == pytest.approx(layered.get_standard_deviation())
+        assert row["AttachmentProbability"] == np.mean(annual_losses > 0)
+        oep = plt_calculator.calculate_oep_curve(layered, 300)
+        aep = plt_calculator.calculate_aep_curve(layered, 300)
+        assert [row["OEP_10"], row["OEP_100"]] == pytest.approx(
+            list(oep.losses_at_return_periods([10, 100])))
+        assert [row["AEP_10"], row["AEP_100"]] == pytest.approx(
+            list(aep.losses_at_return_periods([10, 100])))
+    assert evaluated.loc[0, "ExhaustionProbability"] == np.mean(
+        my_plt.max_occurrence_losses >= 6e4)
+    assert evaluated.loc[1, "ExhaustionProbability"] == pytest.approx(np.mean(
+        evaluated_annual(my_plt, 5e4, 1e5) >= 2e5))
+    assert evaluated.loc[3, "ExhaustionProbability"] == 0
+    assert evaluated.loc[3, "ExpectedLoss"] == pytest.approx(my_plt.get_aal())
+    # a period per chunk, as every period is larger than the chunk
+    assert np.allclose(reinsurance.evaluate_layers(my_plt, layers, return_periods=[10, 100],
+                                                   chunk_size=len(layers)).to_numpy(),
+                       evaluated.to_numpy())
+
+
+def evaluated_annual(my_plt, retention, limit):
+    """ Annual occurrence layer losses """
+    return reinsurance.apply_layer(my_plt, retention, limit).annual_losses
+
+
+def test_apply_reinstatements():
+    """ Test recoveries and reinstatement premiums in date order """
+    reinstated = reinsurance.apply_reinstatements(_plt(), 100, 200, reinstatements=1,
+                                                  rates=0.5, premium=40)
+    assert list(reinstated.plt.losses) == [200, 0, 200, 0, 200]
+    assert list(reinstated.recoveries) == [400, 200, 0]
+    assert list(reinstated.reinstatement_premiums) == [20, 20, 0]
+    assert list(reinstated.plt.columns()["ReinstatementPremium"]) == [0, 0, 20, 0, 20]
+
+    reinstated = reinsurance.apply_reinstatements(_plt(), 100, 200, reinstatements=2,
+                                                  rates=[1, 0.5], premium=40)
+    assert list(reinstated.plt.columns()["ReinstatementPremium"]) == [20, 0, 40, 0, 40]
+    assert list(reinstated.reinstatement_premiums) == [60, 40, 0]
+
+    no_reinstatements = reinsurance.apply_reinstatements(_plt(), 100, 200, reinstatements=0,
+                                                         premium=40)
+    assert list(no_reinstatements.recoveries) == [200, 200, 0]
+    assert list(no_reinstatements.reinstatement_premiums) == [0, 0, 0]
+
+
+def test_apply_reinstatements_time_pro_rata():
+    """ Test reinstatement premium pro rata to the rest of the year """
+    my_plt = PLT.from_arrays([1], [1], [300], [181], [181], number_of_simulations=1)
+    reinstated = reinsurance.apply_reinstatements(my_plt, 100, 200, reinstatements=1,
+                                                  premium=40, time_pro_rata=True)
+    assert reinstated.reinstatement_premiums[0] == pytest.approx(40 * (365 - 181) / 365)
+
+
+def test_apply_reinstatements_rejects_invalid_rates():
+    """ Test a rate count that does not match the reinstatements, or a negative rate """
+    with pytest.raises(ValueError, match="rate per reinstatement"):
+        reinsurance.apply_reinstatements(_plt(), 100, 200, reinstatements=2, rates=[1, 0.5, 0.5])
+    with pytest.raises(ValueError, match="negative"):
+        reinsurance.apply_reinstatements(_plt(), 100, 200, reinstatements=1, rates=-1)
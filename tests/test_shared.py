@@ -0,0 +1,59 @@
+""" Shared PLT tests"""
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+import numpy as np
+from plttools import PLT
+from plttools.plt_calculator import _process_context
+from plttools.shared import SharedPLTs
+from tests.test_plt import DATA
+
+
+def _shared_aal(shared_plt):
+    return PLT.from_shared_memory(shared_plt).get_aal()
+
+
+def test_shared_plt_round_trip():
+    """ Test a PLT attached from shared memory matches the original without copying """
+    my_plt = PLT(DATA, 5)
+    with my_plt.to_shared_memory() as shared_plt:
+        attached = PLT.from_shared_memory(pickle.loads(pickle.dumps(shared_plt)))
+        for name, values in my_plt.columns().items():
+            assert np.array_equal(attached.columns()[name], values)
+        assert not attached.losses.flags.owndata
+        assert attached.simulations == 5
+        assert np.array_equal(attached.period_offsets, my_plt.period_offsets)
+        assert attached.get_aal() == my_plt.get_aal()
+        assert attached.get_standard_deviation() == my_plt.get_standard_deviation()
+        del attached
+
+
+def test_shared_plt_columns():
+    """ Test only the requested columns are shared """
+    with PLT(DATA, 5).to_shared_memory(columns=["PeriodId", "Loss"]) as shared_plt:
+        attached = shared_plt.attach()
+        assert set(attached.columns()) == {"PeriodId", "Loss"}
+        assert attached.get_aal() == PLT(DATA, 5).get_aal()
+        del attached
+
+
+def test_shared_plt_in_worker_process():
+    """ Test a worker process attaches to the block by its handle """
+    my_plt = PLT(DATA, 5)
+    with my_plt.to_shared_memory() as shared_plt:
+        with ProcessPoolExecutor(max_workers=1, mp_context=_process_context()) as pool:
+            aal = pool.submit(_shared_aal, shared_plt).result()
+    assert aal == my_plt.get_aal()
+
+
+def test_shared_plts_in_one_block():
+    """ Test many PLTs are shared in one block and attach to their own arrays """
+    plts = [PLT(DATA, 5), PLT(DATA[:3], 5)]
+    with SharedPLTs(plts, columns=["PeriodId", "Loss"], index=False) as shared_plts:
+        assert len(shared_plts) == 2
+        assert {shared_plt.name for shared_plt in shared_plts} == {shared_plts.name}
+        for my_plt, shared_plt in zip(plts, shared_plts):
+            attached = pickle.loads(pickle.dumps(shared_plt)).attach()
+            assert np.array_equal(attached.losses, my_plt.losses)
+            assert np.array_equal(attached.period_offsets, my_plt.period_offsets)
+            assert attached.get_aal() == my_plt.get_aal()
+            del attached
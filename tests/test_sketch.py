@@ -0,0 +1,77 @@
+""" EP Sketch tests"""
+import numpy as np
+import pytest
+from plttools import EPType, plt_calculator
+from plttools.sketch import EPSketch
+
+
+def _period_losses():
+    rng = np.random.default_rng(11)
+    losses = rng.lognormal(12, 2.5, 10000)
+    losses[rng.random(10000) < 0.3] = 0
+    return losses
+
+
+def test_sketch_curve_within_relative_accuracy():
+    """ Test the approximate EP and TCE losses are within the relative accuracy """
+    losses = _period_losses()
+    sketch = EPSketch(relative_accuracy=0.01)
+    sketch.update(losses)
+    exact = plt_calculator.calculate_ep_curve(losses, EPType.AEP)
+    approximate = sketch.to_ep_curve(EPType.AEP)
+    return_periods = [1.5, 2, 5, 10, 100, 1000, 5000, 10000]
+    assert approximate.losses_at_return_periods(return_periods) == pytest.approx(
+        exact.losses_at_return_periods(return_periods), rel=0.01)
+    assert sketch.tce_losses_at_return_periods(return_periods) == pytest.approx(
+        exact.tce_losses_at_return_periods(return_periods), rel=0.01)
+    assert approximate.loss_at_a_given_return_period(10000) == losses.max()
+
+
+def test_sketch_merge_matches_single_sketch():
+    """ Test sketches of chunks merge into the sketch of all the losses """
+    losses = _period_losses()
+    sketch = EPSketch()
+    sketch.update(losses)
+    merged = EPSketch()
+    for chunk in np.array_split(losses, 7):
+        chunk_sketch = EPSketch()
+        chunk_sketch.update(chunk)
+        merged.merge(chunk_sketch)
+    assert merged.count == len(losses)
+    assert np.array_equal(merged.to_ep_curve(EPType.OEP).losses,
+                          sketch.to_ep_curve(EPType.OEP).losses)
+    with pytest.raises(ValueError):
+        merged.merge(EPSketch(relative_accuracy=0.02))
+
+
+def test_sketch_tce_matches_exact_curve_of_bucket_losses():
+    """ Test the sketch TCE equals the TCE of the full curve of its bucket losses """
+    sketch = EPSketch(relative_accuracy=0.05)
+    sketch.update([1, 2, 2, 3, 10, 10, 10, 50, 0])
+    losses, first_ranks, last_ranks = sketch._buckets(12)  # pylint: disable=protected-access
+    full_curve = plt_calculator.calculate_ep_curve(
+        np.repeat(losses, last_ranks - first_ranks + 1), EPType.AEP)
+    return_periods = [1, 1.2, 1.5, 2, 3, 4, 6, 12, 13, 100]
+    assert sketch.tce_losses_at_return_periods(return_periods, 12) == pytest.approx(
+        full_curve.tce_losses_at_return_periods(return_periods), rel=1e-12)
+
+
+def test_sketch_pads_empty_periods():
+    """ Test periods that were not added count as zero losses """
+    sketch = EPSketch()
+    sketch.update([100, 200])
+    curve = sketch.to_ep_curve(EPType.AEP, number_of_simulations=4)
+    exact = plt_calculator.calculate_ep_curve([100, 200, 0, 0], EPType.AEP)
+    assert curve.losses_at_probabilities([0.25, 0.5, 0.75, 1]) == pytest.approx(
+        exact.losses_at_probabilities([0.25, 0.5, 0.75, 1]), rel=0.01)
+
+
+def test_sketch_collapses_smallest_losses():
+    """ Test the bucket limit keeps the tail accurate """
+    losses = _period_losses()
+    sketch = EPSketch(max_buckets=100)
+    sketch.update(losses)
+    assert len(sketch._positive) + len(sketch._negative) <= 100  # pylint: disable=protected-access
+    exact = plt_calculator.calculate_ep_curve(losses, EPType.AEP)
+    assert sketch.to_ep_curve(EPType.AEP).losses_at_return_periods([100, 1000]) == \
+        pytest.approx(exact.losses_at_return_periods([100, 1000]), rel=0.01)
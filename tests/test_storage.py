@@ -0,0 +1,65 @@
+""" PLT storage tests"""
+import numpy as np
+import pytest
+from plttools import PLT
+from tests.test_plt import DATA
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather"])
+def test_plt_round_trip(tmp_path, file_format):
+    """ Test a PLT written to parquet or feather reads back the same """
+    my_plt = PLT(DATA, 5)
+    path = str(tmp_path / "plt.{0}".format(file_format))
+    getattr(my_plt, "to_{0}".format(file_format))(path)
+    read_plt = getattr(PLT, "from_{0}".format(file_format))(path, number_of_simulations=5)
+    for name, values in my_plt.columns().items():
+        assert np.array_equal(read_plt.columns()[name], values)
+    assert read_plt.get_aal() == my_plt.get_aal()
+
+
+def test_read_parquet_period_range_and_columns(tmp_path):
+    """ Test reading a period range and projecting optional columns """
+    rows = [dict(row, Peril="WS", Country="US") for row in DATA]
+    path = str(tmp_path / "plt.parquet")
+    PLT(rows, 5).to_parquet(path, row_group_size=2)
+    read_plt = PLT.from_parquet(path, columns=["Peril"], periods=(3, 4), number_of_simulations=5)
+    assert set(read_plt.columns()) == set(PLT.REQUIRED_COLUMNS + ["Peril"])
+    assert list(np.unique(read_plt.period_ids)) == [3, 4]
+    assert read_plt.get_aal() == 700
+    assert list(read_plt.categories("Peril")) == ["WS"]
+    assert list(read_plt.plt["Peril"]) == ["WS"] * len(read_plt)
+
+
+def test_mmap_round_trip(tmp_path):
+    """ Test a PLT saved to the memory-mapped store opens with the same metrics """
+    rows = [dict(row, Peril="WS") for row in DATA]
+    my_plt = PLT(rows, 6)
+    path = str(tmp_path / "plt")
+    my_plt.save_mmap(path)
+    mapped_plt = PLT.open_mmap(path)
+    assert _is_memory_mapped(mapped_plt.losses)
+    assert mapped_plt.simulations == 6
+    assert list(mapped_plt.period_offsets) == list(my_plt.period_offsets)
+    assert list(mapped_plt.annual_losses) == list(my_plt.annual_losses)
+    assert mapped_plt.get_standard_deviation() == my_plt.get_standard_deviation()
+    assert list(mapped_plt.plt["Peril"]) == ["WS"] * len(DATA)
+    assert list(mapped_plt.filter(Peril="WS").annual_losses) == list(my_plt.annual_losses)
+    assert "Peril" not in PLT.open_mmap(path, columns=[]).columns()
+
+
+def test_mmap_period_range(tmp_path):
+    """ Test opening a period range of the memory-mapped store """
+    path = str(tmp_path / "plt")
+    PLT(DATA, 6).save_mmap(path)
+    mapped_plt = PLT.open_mmap(path, periods=(2, 4))
+    assert list(mapped_plt.annual_losses) == [0, 0, 500, 3000, 0, 0]
+    assert list(mapped_plt.losses[mapped_plt.period_slice(3)]) == [200, 300]
+    assert len(PLT.open_mmap(path, periods=(7, 9))) == 0
+
+
+def _is_memory_mapped(values):
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base
+    return values is not None
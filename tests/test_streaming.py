@@ -0,0 +1,71 @@
+""" Streaming tests"""
+import numpy as np
+import pandas as pd
+import pytest
+from plttools import PLT, plt_calculator, streaming
+from tests.test_plt import DATA
+
+
+def test_read_csv_period_losses_matches_plt(tmp_path):
+    """ Test metrics streamed from a CSV in chunks match those of the loaded PLT """
+    path = tmp_path / "plt.csv"
+    pd.DataFrame(DATA).to_csv(path, index=False)
+    aggregator = streaming.read_csv_period_losses(path, 6, chunksize=2)
+    my_plt = PLT(DATA, 6)
+    assert list(aggregator.annual_losses) == list(my_plt.annual_losses)
+    assert list(aggregator.max_occurrence_losses) == list(my_plt.max_occurrence_losses)
+    assert aggregator.get_aal() == my_plt.get_aal()
+    assert aggregator.get_standard_deviation() == pytest.approx(my_plt.get_standard_deviation())
+    oep = plt_calculator.calculate_oep_curve(my_plt, 6)
+    aep = plt_calculator.calculate_aep_curve(my_plt, 6)
+    assert aggregator.calculate_oep_curve().get_standard_return_period_ep() == \
+        oep.get_standard_return_period_ep()
+    assert aggregator.calculate_aep_curve().get_standard_return_period_ep() == \
+        aep.get_standard_return_period_ep()
+
+
+def test_period_aggregator_ignores_periods_outside_simulations():
+    """ Test losses outside the simulation periods are ignored """
+    aggregator = streaming.PeriodAggregator(2)
+    aggregator.update([1, 2, 3, 0], [-5, 10, 100, 100])
+    aggregator.update([1], [-1])
+    assert list(aggregator.annual_losses) == [-6, 10]
+    assert list(aggregator.max_occurrence_losses) == [-1, 10]
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 100])
+def test_streaming_moments_match_pandas(chunksize):
+    """ Test moments streamed in chunks match pandas over the dense annual losses """
+    rng = np.random.default_rng(3)
+    period_ids = np.sort(rng.integers(1, 40, 200))
+    losses = rng.lognormal(8, 1.5, 200)
+    moments = streaming.StreamingMoments(50)
+    for start in range(0, 200, chunksize):
+        moments.update(period_ids[start:start + chunksize], losses[start:start + chunksize])
+    annual_losses = pd.Series(plt_calculator.dense_annual_losses(period_ids, losses, 50))
+    assert moments.periods == 50
+    assert moments.get_aal() == pytest.approx(annual_losses.mean())
+    assert moments.get_variance() == pytest.approx(annual_losses.var())
+    assert moments.get_standard_deviation() == pytest.approx(annual_losses.std())
+    assert moments.get_cv() == pytest.approx(annual_losses.std() / annual_losses.mean())
+    assert moments.get_skewness() == pytest.approx(annual_losses.skew())
+    assert moments.get_kurtosis() == pytest.approx(annual_losses.kurt())
+
+
+def test_streaming_moments_without_simulations():
+    """ Test moments over the periods with losses only match the PLT's period sums """
+    moments = streaming.StreamingMoments()
+    my_plt = PLT(DATA)
+    moments.update(my_plt.period_ids, my_plt.losses)
+    period_losses = pd.Series(my_plt.period_sums()[1])
+    assert moments.periods == len(period_losses)
+    assert moments.get_aal() == pytest.approx(period_losses.mean())
+    assert moments.get_standard_deviation() == pytest.approx(period_losses.std())
+
+
+def test_streaming_moments_requires_sorted_periods():
+    """ Test chunks out of period order are rejected """
+    moments = streaming.StreamingMoments(5)
+    moments.update([1, 3], [10, 20])
+    with pytest.raises(ValueError):
+        moments.update([2], [5])